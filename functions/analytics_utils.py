@@ -0,0 +1,150 @@
+from contextlib import nullcontext
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from functions.excel_utils import ANALYSIS_SHEET, save_workbook
+from functions.result_utilis import load_ram_info
+
+SECONDS_PER_YEAR = 365.25 * 86400
+LEVELS = ["PHMA (m NGF)", "PMVE (m NGF)", "PMME (m NGF)", "NM (m NGF)"]
+THEIL_SEN_MAX_POINTS = 2000  # au-delà, sous-échantillonnage régulier (n² paires)
+# Quantiles 97,5 % exacts de Student pour 1 à 3 degrés de liberté
+STUDENT_T975_SMALL = {1: 12.706205, 2: 4.302653, 3: 3.182446}
+
+
+def _student_t975(dof):
+    """
+    Quantile 97,5 % de Student, vectorisé et sans dépendre de scipy : valeurs exactes
+    jusqu'à 3 degrés de liberté, développement de Cornish-Fisher au-delà (écart < 1 %).
+    """
+    z = 1.959964
+    dof = np.asarray(dof, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = (z + (z ** 3 + z) / (4 * dof)
+             + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * dof ** 2)
+             + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * dof ** 3))
+    for small, exact in STUDENT_T975_SMALL.items():
+        t = np.where(dof == small, exact, t)
+    return np.where(dof > 0, t, np.nan)
+
+
+def _theil_sen(t, h):
+    """Pente de Theil-Sen : médiane des pentes de toutes les paires de points."""
+    if len(t) < 3:
+        return np.nan
+    if len(t) > THEIL_SEN_MAX_POINTS:
+        keep = np.linspace(0, len(t) - 1, THEIL_SEN_MAX_POINTS).astype(int)
+        t, h = t[keep], h[keep]
+    i, j = np.triu_indices(len(t), k=1)
+    dt = t[j] - t[i]
+    valid = dt > 0
+    if not valid.any():
+        return np.nan
+    return float(np.median((h[j] - h[i])[valid] / dt[valid]))
+
+
+def compute_station_trends(table: pd.DataFrame, ram_info: dict = None) -> pd.DataFrame:
+    """
+    Statistiques par station à partir de la table longue de build_measurement_table :
+    tendance linéaire (m/an) et son intervalle de confiance à 95 %, tendance robuste
+    de Theil-Sen, amplitude saisonnière (moyennes mensuelles des résidus) et
+    franchissements des niveaux PHMA / PMVE / PMME / NM de Ram2022.
+    Les moindres carrés, la saisonnalité et les franchissements sont calculés en une
+    passe groupby sur toutes les stations à la fois.
+    """
+    ram_info = ram_info if ram_info is not None else load_ram_info()
+    data = table.loc[
+        table["timestamp"].notna() & table["sand_height_m"].notna(),
+        ["station", "timestamp", "sand_height_m"]
+    ].sort_values(["station", "timestamp"]).reset_index(drop=True)
+    if data.empty:
+        return pd.DataFrame()
+
+    epoch = data["timestamp"].min()
+    data["t"] = (data["timestamp"] - epoch).dt.total_seconds() / SECONDS_PER_YEAR
+    data["h"] = data["sand_height_m"]
+    g = data.groupby("station", sort=True)
+
+    # Moindres carrés ordinaires vectorisés (sommes par station)
+    n = g.size()
+    t_mean = g["t"].mean()
+    h_mean = g["h"].mean()
+    dt = data["t"] - data["station"].map(t_mean)
+    dh = data["h"] - data["station"].map(h_mean)
+    sxx = (dt * dt).groupby(data["station"]).sum()
+    sxy = (dt * dh).groupby(data["station"]).sum()
+    syy = (dh * dh).groupby(data["station"]).sum()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = sxy / sxx
+        sse = (syy - slope * sxy).clip(lower=0)
+        se = np.sqrt(sse / (n - 2) / sxx)
+    half_ci = pd.Series(_student_t975(n - 2), index=n.index) * se
+    slope = slope.where(n >= 3)
+    half_ci = half_ci.where(n >= 3)
+
+    # Saisonnalité : moyenne mensuelle des résidus de la droite de tendance
+    intercept = h_mean - slope * t_mean
+    data["residual"] = data["h"] - (data["station"].map(intercept) + data["station"].map(slope) * data["t"])
+    data["month"] = data["timestamp"].dt.month
+    monthly = data.groupby(["station", "month"])["residual"].mean().unstack()
+    covered = monthly.notna().sum(axis=1)
+    amplitude = (monthly.max(axis=1) - monthly.min(axis=1)).where(covered >= 6)
+    peak_month = monthly.fillna(-np.inf).idxmax(axis=1).where(covered >= 6)
+
+    summary = pd.DataFrame({
+        "Station": n.index,
+        "Nb mesures": n.values,
+        "Première mesure": g["timestamp"].min().values,
+        "Dernière mesure": g["timestamp"].max().values,
+        "Hauteur moyenne (m)": h_mean.values,
+        "Tendance (m/an)": slope.values,
+        "IC 95 % bas (m/an)": (slope - half_ci).values,
+        "IC 95 % haut (m/an)": (slope + half_ci).values,
+        "Theil-Sen (m/an)": [
+            _theil_sen(grp["t"].to_numpy(), grp["h"].to_numpy()) for _, grp in g
+        ],
+        "Amplitude saisonnière (m)": amplitude.reindex(n.index).values,
+        "Mois le plus haut": peak_month.reindex(n.index).values,
+    })
+
+    # Franchissements des niveaux de référence (changements de signe de h - niveau)
+    same_station = data["station"].eq(data["station"].shift())
+    for level in LEVELS:
+        level_by_station = {
+            code: pd.to_numeric(info.get(level), errors="coerce") for code, info in ram_info.items()
+        }
+        ref = data["station"].map(level_by_station).astype(float)
+        above = np.sign(data["h"] - ref)
+        crossed = same_station & above.ne(above.shift()) & above.notna() & above.shift().notna()
+        short = level.replace(" (m NGF)", "")
+        below = (data["h"] < ref).astype(float).where(ref.notna())
+        summary[f"Sous {short} (%)"] = (
+            below.groupby(data["station"]).mean() * 100
+        ).reindex(n.index).values
+        summary[f"Franchissements {short}"] = crossed.groupby(data["station"]).sum().reindex(n.index).values
+
+    return summary
+
+
+def write_analysis_sheet(excel_file: str, summary: pd.DataFrame, lock=None):
+    """
+    Écrit le tableau d'analyse dans la feuille Analyse, placée juste après Résumé.
+    lock : verrou d'écriture du classeur partagé (functions.work_queue.workbook_lock_for).
+    """
+    with lock or nullcontext():
+        wb = load_workbook(excel_file)
+        if ANALYSIS_SHEET in wb.sheetnames:
+            wb.remove(wb[ANALYSIS_SHEET])
+        index = wb.sheetnames.index("Résumé") + 1 if "Résumé" in wb.sheetnames else 0
+        ws = wb.create_sheet(title=ANALYSIS_SHEET, index=index)
+        ws.append(list(summary.columns))
+        for row in summary.itertuples(index=False):
+            ws.append([
+                None if (isinstance(v, float) and np.isnan(v)) or v is pd.NaT
+                else v.to_pydatetime() if isinstance(v, pd.Timestamp)
+                else v.item() if isinstance(v, np.generic)
+                else v
+                for v in row
+            ])
+        save_workbook(wb, excel_file)
@@ -0,0 +1,188 @@
+import os
+import sqlite3
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageDraw
+
+# Rectangles règle / piquet enregistrés à chaque mesure, à côté du classeur
+SELECTIONS_DB_NAME = "selections.db"
+EVIDENCE_MAX_PX = 1024   # décodage JPEG à résolution réduite (Image.draft)
+EVIDENCE_MARGIN = 0.15   # marge autour des deux rectangles, en fraction de leur emprise
+EVIDENCE_JPEG_QUALITY = 70
+RULER_COLOR = (255, 0, 0)
+STAKE_COLOR = (0, 0, 255)
+PDF_CHUNK_PAGES = 50     # pages ouvertes à la fois lors de l'assemblage d'un PDF
+
+
+def selections_path_for(excel_file: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(excel_file)), SELECTIONS_DB_NAME)
+
+
+def _connect(db_path):
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS selections (
+            station TEXT NOT NULL,
+            photo TEXT NOT NULL,
+            taken_at TEXT,
+            rotation INTEGER NOT NULL DEFAULT 0,
+            ruler_x REAL, ruler_y REAL, ruler_w REAL, ruler_h REAL,
+            stake_x REAL, stake_y REAL, stake_w REAL, stake_h REAL,
+            result REAL,
+            operator TEXT,
+            saved_at REAL,
+            PRIMARY KEY (station, photo)
+        )
+    """)
+    return conn
+
+
+def save_selection(db_path, station, photo, taken_at, rotation, ruler, stake, result, operator=None):
+    """
+    Enregistre les rectangles d'une mesure. ruler et stake sont (x, y, l, h) en fractions
+    de l'image affichée après rotation, donc indépendants de la résolution d'affichage.
+    """
+    conn = _connect(db_path)
+    with conn:
+        conn.execute(
+            "REPLACE INTO selections VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (station, photo, taken_at, int(rotation) % 360, *ruler, *stake,
+             float(result), operator, time.time())
+        )
+    conn.close()
+
+
+def load_selections(db_path, stations=None, date_min=None, date_max=None, include_undated=True) -> list:
+    """
+    Relit les mesures enregistrées, filtrées par stations et par date de prise de vue
+    (chaînes ISO « aaaa-mm-jj », bornes incluses). Les photos sans date (heure absente
+    du nom) sont conservées si include_undated. Retourne une liste de dict.
+    """
+    if not os.path.exists(db_path):
+        return []
+    query = "SELECT * FROM selections WHERE 1=1"
+    params = []
+    if stations:
+        query += f" AND station IN ({','.join('?' * len(stations))})"
+        params.extend(stations)
+    dated = []
+    if date_min:
+        dated.append("taken_at >= ?")
+        params.append(date_min)
+    if date_max:
+        dated.append("taken_at < ?")
+        params.append(date_max + "T99")  # inclut toute la journée de date_max
+    if dated:
+        condition = " AND ".join(dated)
+        query += f" AND (({condition}) OR taken_at IS NULL)" if include_undated else f" AND {condition}"
+    conn = _connect(db_path)
+    conn.row_factory = sqlite3.Row
+    rows = [dict(r) for r in conn.execute(query + " ORDER BY station, taken_at, photo", params)]
+    conn.close()
+    return rows
+
+
+def render_evidence(job) -> str:
+    """
+    Produit la vignette de contrôle d'une mesure (exécuté dans un processus du pool).
+    job : (chemin_photo, chemin_sortie, sélection). Retourne chemin_sortie, ou "" en cas d'échec.
+    """
+    photo_path, out_path, sel = job
+    try:
+        with Image.open(photo_path) as img:
+            img.draft("RGB", (EVIDENCE_MAX_PX, EVIDENCE_MAX_PX))  # décodage JPEG réduit (1/2, 1/4, 1/8)
+            img = img.convert("RGB")
+            img.thumbnail((EVIDENCE_MAX_PX, EVIDENCE_MAX_PX))
+        if sel["rotation"]:
+            # Qt tourne dans le sens horaire, PIL dans le sens trigonométrique
+            img = img.rotate(-sel["rotation"], expand=True)
+
+        w, h = img.size
+        boxes = []
+        for prefix in ("ruler", "stake"):
+            x, y, bw, bh = (sel[f"{prefix}_{k}"] for k in "xywh")
+            boxes.append((x * w, y * h, (x + bw) * w, (y + bh) * h))
+
+        left = min(b[0] for b in boxes)
+        top = min(b[1] for b in boxes)
+        right = max(b[2] for b in boxes)
+        bottom = max(b[3] for b in boxes)
+        mx = (right - left) * EVIDENCE_MARGIN + 10
+        my = (bottom - top) * EVIDENCE_MARGIN + 10
+        crop = (max(int(left - mx), 0), max(int(top - my), 0),
+                min(int(right + mx), w), min(int(bottom + my), h))
+
+        draw = ImageDraw.Draw(img)
+        for box, color in zip(boxes, (RULER_COLOR, STAKE_COLOR)):
+            draw.rectangle(box, outline=color, width=3)
+        img = img.crop(crop)
+
+        label = f"{sel['station']}  {sel['taken_at'] or sel['photo']}  {sel['result']:.2f} cm"
+        banner = Image.new("RGB", (max(img.width, 6 * len(label) + 10), img.height + 18), "white")
+        banner.paste(img, (0, 18))
+        ImageDraw.Draw(banner).text((4, 3), label, fill="black")
+
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        banner.save(out_path, "JPEG", quality=EVIDENCE_JPEG_QUALITY, optimize=True)
+        return out_path
+    except Exception as e:
+        print(f"[{photo_path}] Preuve impossible : {e}")
+        return ""
+
+
+def _write_station_pdf(pdf_path, paths):
+    """PDF multipage assemblé par blocs de PDF_CHUNK_PAGES : le nombre de fichiers ouverts reste borné."""
+    for start in range(0, len(paths), PDF_CHUNK_PAGES):
+        pages = [Image.open(p) for p in paths[start:start + PDF_CHUNK_PAGES]]
+        try:
+            pages[0].save(pdf_path, "PDF", save_all=True, append_images=pages[1:],
+                          append=start > 0, resolution=100)
+        finally:
+            for page in pages:
+                page.close()
+
+
+def export_evidence(selections, input_folder, out_folder, pdf=False, max_workers=None,
+                    progress=None) -> list:
+    """
+    Exporte en parallèle (pool de processus) une vignette annotée par mesure, dans
+    out_folder/<station>/. Avec pdf=True, les vignettes de chaque station sont
+    assemblées en un PDF multipage out_folder/<station>.pdf.
+    progress(fait, total) est appelé après chaque vignette.
+    Retourne la liste des fichiers produits.
+    """
+    jobs = []
+    for sel in selections:
+        photo_path = os.path.join(input_folder, sel["station"], sel["photo"])
+        if not os.path.exists(photo_path):
+            continue
+        stem = os.path.splitext(sel["photo"])[0]
+        jobs.append((photo_path, os.path.join(out_folder, sel["station"], f"{stem}_preuve.jpg"), sel))
+    if not jobs:
+        return []
+
+    workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+    results = []
+    # spawn : pas de fork d'un processus Qt dont d'autres threads (vignettes) tournent
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        chunksize = max(1, len(jobs) // (workers * 4))
+        for path in pool.map(render_evidence, jobs, chunksize=chunksize):
+            results.append(path)
+            if progress is not None:
+                progress(len(results), len(jobs))
+
+    produced = [path for path in results if path]
+    if not pdf:
+        return produced
+
+    pdfs = []
+    by_station = {}
+    for (_, out_path, sel), path in zip(jobs, results):
+        if path:
+            by_station.setdefault(sel["station"], []).append(path)
+    for station, paths in by_station.items():
+        pdf_path = os.path.join(out_folder, f"{station}.pdf")
+        _write_station_pdf(pdf_path, paths)
+        pdfs.append(pdf_path)
+    return pdfs
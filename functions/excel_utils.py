@@ -2,9 +2,16 @@
 import os
 import csv
 import re
+from contextlib import nullcontext
 from openpyxl import Workbook, load_workbook
 from openpyxl.styles import numbers
 
+PHOTO_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+ANALYSIS_SHEET = "Analyse"
+RESULTS_WORKBOOK_NAME = "resultats_photos.xlsx"
+# Feuilles du classeur qui ne correspondent pas à une station
+NON_STATION_SHEETS = ("Résumé", ANALYSIS_SHEET)
+
 def parse_photo_date_time(name):
     try:
         base = os.path.basename(name)
@@ -28,6 +35,13 @@ def parse_photo_date_time(name):
     except Exception:
         return "--/--/----", "--:--"
 
+def list_station_photos(station_path):
+    """Photos d'un dossier station, triées par nom (donc par date de prise de vue)."""
+    return sorted([
+        f for f in os.listdir(station_path)
+        if f.lower().endswith(PHOTO_EXTENSIONS)
+    ])
+
 def load_stations_info():
     station_info = {}
     with open('Database/station.csv', newline='', encoding='utf-8') as csvfile:
@@ -41,8 +55,48 @@ def load_stations_info():
             }
     return station_info
 
-def create_or_update_excel(input_folder, output_folder):
-    excel_file = os.path.join(output_folder, "resultats_photos.xlsx")
+def load_station_coordinates():
+    """
+    Retourne { code_station: (lat, lon) } en flottants, à partir de station.csv
+    (les coordonnées y sont écrites avec une virgule décimale).
+    """
+    coords = {}
+    for code, info in load_stations_info().items():
+        try:
+            lat = float(str(info['Latitude']).replace(",", "."))
+            lon = float(str(info['Longitude']).replace(",", "."))
+        except ValueError:
+            continue
+        if lat == 0 and lon == 0:
+            continue  # coordonnées non renseignées (0, 0 dans station.csv)
+        coords[code.strip().upper()] = (lat, lon)
+    return coords
+
+def save_workbook(wb, excel_file):
+    """
+    Sauvegarde dans un fichier temporaire du même dossier puis remplacement atomique :
+    un lecteur (ou un plantage) ne voit jamais un classeur à moitié écrit.
+    """
+    # Nom propre au processus, créé par openpyxl avec les droits par défaut (partage réseau)
+    folder, name = os.path.split(os.path.abspath(excel_file))
+    tmp = os.path.join(folder, f".~{os.getpid()}_{name}")
+    try:
+        wb.save(tmp)
+        os.replace(tmp, excel_file)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def create_or_update_excel(input_folder, output_folder, lock=None):
+    """
+    lock : verrou d'écriture du classeur partagé (functions.work_queue.workbook_lock_for),
+    tenu de la lecture à la sauvegarde.
+    """
+    excel_file = os.path.join(output_folder, RESULTS_WORKBOOK_NAME)
+    with lock or nullcontext():
+        return _create_or_update_excel(input_folder, excel_file)
+
+def _create_or_update_excel(input_folder, excel_file):
     station_info = load_stations_info()
 
     if os.path.exists(excel_file):
@@ -56,10 +110,7 @@ def create_or_update_excel(input_folder, output_folder):
         station_path = os.path.join(input_folder, station)
         if not os.path.isdir(station_path):
             continue
-        all_photos[station] = sorted([
-            f for f in os.listdir(station_path)
-            if f.lower().endswith(('.jpg', '.jpeg', '.png'))
-        ])
+        all_photos[station] = list_station_photos(station_path)
 
     for station, photos in all_photos.items():
         old_data = {}
@@ -107,13 +158,67 @@ def create_or_update_excel(input_folder, output_folder):
         z_cc49 = info.get('Z_CC49', '')
         resume_sheet.append([station, commune, lat, lon, z_cc49, len(photos)])
 
-    wb.save(excel_file)
-    return excel_file
-
-def update_excel_result(excel_file, sheet, row, new_value):
+    save_workbook(wb, excel_file)
+    n_photos = sum(len(photos) for photos in all_photos.values())
+    msg = f"{len(all_photos)} station(s), {n_photos} photo(s) référencées."
+    return excel_file, msg
+
+def append_photos_to_excel(excel_file, new_photos, lock=None):
+    """
+    Ajoute de nouvelles photos { station: [photos] } à la fin de leur feuille station,
+    sans relire le dossier d'entrée, et met à jour le nombre de photos du Résumé.
+    Retourne [(feuille, index_ligne, photo)] au format de MeasureTab.missing_photos.
+    Les photos déjà présentes sont ignorées : sous le verrou lock, plusieurs
+    opérateurs surveillant le même dossier n'ajoutent chaque photo qu'une fois.
+    """
+    with lock or nullcontext():
+        return _append_photos_to_excel(excel_file, new_photos)
+
+def _append_photos_to_excel(excel_file, new_photos):
     wb = load_workbook(excel_file)
-    if sheet not in wb.sheetnames:
-        return
-    ws = wb[sheet]
-    ws.cell(row=row + 2, column=4, value=new_value)
-    wb.save(excel_file)
+    station_info = load_stations_info()
+    added = []
+    for station, photos in new_photos.items():
+        if station in wb.sheetnames:
+            ws = wb[station]
+        else:
+            ws = wb.create_sheet(title=station)
+            ws.append(["Nom de la photo", "Date", "Heure", "Résultat"])
+        header = [c.value for c in ws[1]]
+        existing = {r[0] for r in ws.iter_rows(min_row=2, max_col=1, values_only=True)}
+        for photo in photos:
+            if photo in existing:
+                continue
+            date_fmt, heure_fmt = parse_photo_date_time(photo)
+            if "Date / Heure" in header:
+                # Ancienne version : colonne unique "jj/mm/aaaa HHhMMmSS"
+                ws.append([photo, f"{date_fmt} {heure_fmt.replace(':', 'h', 1).replace(':', 'm', 1)}", ""])
+            else:
+                ws.append([photo, date_fmt, heure_fmt, ""])
+                ws.cell(row=ws.max_row, column=2).number_format = numbers.FORMAT_TEXT
+                ws.cell(row=ws.max_row, column=3).number_format = numbers.FORMAT_TEXT
+            added.append((station, ws.max_row - 2, photo))
+
+    if added and "Résumé" in wb.sheetnames:
+        resume_sheet = wb["Résumé"]
+        counts = {r[0].value: r for r in resume_sheet.iter_rows(min_row=2)}
+        for station in new_photos:
+            n_photos = wb[station].max_row - 1
+            if station in counts:
+                counts[station][-1].value = n_photos
+            else:
+                info = station_info.get(station, {})
+                resume_sheet.append([station, info.get('Commune', 'Inconnu'), info.get('Latitude', ''),
+                                     info.get('Longitude', ''), info.get('Z_CC49', ''), n_photos])
+    if added:
+        save_workbook(wb, excel_file)
+    return added
+
+def update_excel_result(excel_file, sheet, row, new_value, lock=None):
+    with lock or nullcontext():
+        wb = load_workbook(excel_file)
+        if sheet not in wb.sheetnames:
+            return
+        ws = wb[sheet]
+        ws.cell(row=row + 2, column=4, value=new_value)
+        save_workbook(wb, excel_file)
@@ -0,0 +1,222 @@
+import os
+import numpy as np
+import pandas as pd
+
+from functions.excel_utils import load_station_coordinates
+
+# Cache colonnaire des données météo / vagues dans Database/cache
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+CACHE_DIR = os.path.join(BASE_DIR, "Database", "cache")
+CACHE_FILES = {
+    "meteo": os.path.join(CACHE_DIR, "meteo.parquet"),
+    "vagues": os.path.join(CACHE_DIR, "vagues.parquet"),
+}
+
+# Colonnes conservées dans les exports Météo-France (fichiers horaires "H_xx")
+METEO_COLUMNS = {
+    "NUM_POSTE": "poste",
+    "LAT": "lat",
+    "LON": "lon",
+    "AAAAMMJJHH": "date",
+    "FF": "vent_ms",
+    "DD": "vent_dir",
+    "FXI": "rafale_ms",
+}
+METEO_DATE_FORMAT = "%Y%m%d%H"
+
+# Colonnes conservées dans les exports de campagne CANDHIS
+WAVE_COLUMNS = {
+    "DateHeure": "date",
+    "H1/3": "vagues_h13_m",
+    "Hmax": "vagues_hmax_m",
+    "Th1/3": "vagues_th13_s",
+}
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Distance orthodromique (km), vectorisée sur des tableaux NumPy."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2.0) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2.0) ** 2)
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def _usecols(mapping: dict):
+    """Filtre usecols insensible à la casse et aux espaces autour des en-têtes."""
+    wanted = {k.strip().lower() for k in mapping}
+    return lambda col: col.strip().lower() in wanted
+
+
+def _rename(chunk: pd.DataFrame, mapping: dict) -> pd.DataFrame:
+    lower = {k.strip().lower(): v for k, v in mapping.items()}
+    return chunk.rename(columns=lambda c: lower.get(c.strip().lower(), c))
+
+
+def _compact(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Réduit l'empreinte mémoire : float32 pour les mesures, texte pour les postes.
+    Les valeurs lues comme texte peuvent être écrites avec une virgule décimale.
+    """
+    for col in df.columns:
+        if col in ("date", "poste"):
+            continue
+        values = df[col]
+        if not pd.api.types.is_numeric_dtype(values):
+            values = values.astype(str).str.replace(",", ".", regex=False)
+        df[col] = pd.to_numeric(values, errors="coerce").astype("float32")
+    df["poste"] = df["poste"].astype(str)
+    return df
+
+
+def _write_cache(kind: str, new_data: pd.DataFrame) -> str:
+    """Fusionne new_data dans le cache colonnaire existant (dédoublonné par poste/date)."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = CACHE_FILES[kind]
+    if os.path.exists(path):
+        new_data = pd.concat([pd.read_parquet(path), new_data], ignore_index=True)
+    new_data = (new_data
+                .drop_duplicates(subset=["poste", "date"], keep="last")
+                .sort_values(["poste", "date"])
+                .reset_index(drop=True))
+    new_data.to_parquet(path, index=False)
+    return path
+
+
+def ingest_meteo_csv(csv_path: str, max_distance_km: float = 25.0,
+                     date_min=None, date_max=None,
+                     chunksize: int = 200_000, sep: str = ";") -> str:
+    """
+    Lit un export Météo-France par blocs et ne garde que les postes situés à moins
+    de max_distance_km d'une station de station.csv, sur la fenêtre [date_min, date_max].
+    Retourne le chemin du cache Parquet mis à jour.
+    """
+    coords = load_station_coordinates()
+    if not coords:
+        raise ValueError("Aucune coordonnée de station disponible dans station.csv.")
+    st_lat = np.array([c[0] for c in coords.values()])
+    st_lon = np.array([c[1] for c in coords.values()])
+    date_min = pd.to_datetime(date_min) if date_min is not None else None
+    date_max = pd.to_datetime(date_max) if date_max is not None else None
+
+    # Décision "poste proche ou non", mémorisée pour ne la calculer qu'une fois par poste
+    near_cache = {}
+    kept = []
+    reader = pd.read_csv(
+        csv_path, sep=sep, usecols=_usecols(METEO_COLUMNS),
+        chunksize=chunksize, dtype=str, low_memory=False
+    )
+    for chunk in reader:
+        chunk = _rename(chunk, METEO_COLUMNS)
+        chunk["lat"] = pd.to_numeric(chunk["lat"].str.replace(",", "."), errors="coerce")
+        chunk["lon"] = pd.to_numeric(chunk["lon"].str.replace(",", "."), errors="coerce")
+
+        postes = chunk[["poste", "lat", "lon"]].drop_duplicates("poste")
+        for poste, lat, lon in postes.itertuples(index=False):
+            if poste not in near_cache:
+                dist = haversine_km(lat, lon, st_lat, st_lon)
+                near_cache[poste] = bool(np.nanmin(dist) <= max_distance_km)
+        chunk = chunk[chunk["poste"].map(near_cache)].copy()
+        if chunk.empty:
+            continue
+
+        chunk["date"] = pd.to_datetime(chunk["date"], format=METEO_DATE_FORMAT, errors="coerce")
+        if date_min is not None:
+            chunk = chunk[chunk["date"] >= date_min]
+        if date_max is not None:
+            chunk = chunk[chunk["date"] <= date_max]
+        if not chunk.empty:
+            kept.append(_compact(chunk.dropna(subset=["date"]).copy()))
+
+    if not kept:
+        raise ValueError("Aucune donnée météo à proximité des stations dans ce fichier.")
+    return _write_cache("meteo", pd.concat(kept, ignore_index=True))
+
+
+def ingest_wave_csv(csv_path: str, buoy_id: str, buoy_lat: float, buoy_lon: float,
+                    max_distance_km: float = 25.0, date_min=None, date_max=None,
+                    chunksize: int = 200_000, sep: str = ";") -> str:
+    """
+    Lit un export de campagne CANDHIS par blocs. Le fichier ne contient pas la
+    position de la bouée : elle est fournie par l'appelant et stockée avec les mesures.
+    La bouée doit être à moins de max_distance_km d'une station, sans quoi ses données
+    ne seraient jamais associées à aucune (position non renseignée, par exemple).
+    """
+    coords = load_station_coordinates()
+    if coords:
+        dist = haversine_km(buoy_lat, buoy_lon,
+                            np.array([c[0] for c in coords.values()]),
+                            np.array([c[1] for c in coords.values()]))
+        if np.nanmin(dist) > max_distance_km:
+            raise ValueError(
+                f"La bouée ({buoy_lat:.5f}, {buoy_lon:.5f}) est à {np.nanmin(dist):.0f} km de la "
+                f"station la plus proche (maximum {max_distance_km:.0f} km) : vérifiez sa position."
+            )
+    date_min = pd.to_datetime(date_min) if date_min is not None else None
+    date_max = pd.to_datetime(date_max) if date_max is not None else None
+
+    kept = []
+    reader = pd.read_csv(
+        csv_path, sep=sep, usecols=_usecols(WAVE_COLUMNS),
+        chunksize=chunksize, dtype=str, low_memory=False
+    )
+    for chunk in reader:
+        chunk = _rename(chunk, WAVE_COLUMNS)
+        chunk["date"] = pd.to_datetime(chunk["date"], dayfirst=True, errors="coerce")
+        if date_min is not None:
+            chunk = chunk[chunk["date"] >= date_min]
+        if date_max is not None:
+            chunk = chunk[chunk["date"] <= date_max]
+        chunk = chunk.dropna(subset=["date"]).copy()
+        if chunk.empty:
+            continue
+        chunk["poste"] = str(buoy_id)
+        chunk["lat"] = buoy_lat
+        chunk["lon"] = buoy_lon
+        kept.append(_compact(chunk))
+
+    if not kept:
+        raise ValueError("Aucune donnée de vagues dans la fenêtre demandée.")
+    return _write_cache("vagues", pd.concat(kept, ignore_index=True))
+
+
+def load_environment_series(station: str, kind: str, columns=None,
+                            max_distance_km: float = 25.0) -> pd.DataFrame:
+    """
+    Retourne la série horaire du poste (ou de la bouée) le plus proche de la station,
+    en ne lisant du cache que les colonnes nécessaires. DataFrame vide si rien n'est disponible.
+    """
+    path = CACHE_FILES[kind]
+    coords = load_station_coordinates().get(station.strip().upper())
+    if coords is None or not os.path.exists(path):
+        return pd.DataFrame()
+
+    postes = pd.read_parquet(path, columns=["poste", "lat", "lon"]).drop_duplicates("poste")
+    dist = haversine_km(postes["lat"].to_numpy(), postes["lon"].to_numpy(), coords[0], coords[1])
+    if len(dist) == 0 or np.nanmin(dist) > max_distance_km:
+        return pd.DataFrame()
+    nearest = postes["poste"].iloc[int(np.nanargmin(dist))]
+
+    read_cols = ["poste", "date"] + list(columns) if columns else None
+    series = pd.read_parquet(path, columns=read_cols, filters=[("poste", "==", nearest)])
+    return series.drop(columns=["poste", "lat", "lon"], errors="ignore").sort_values("date")
+
+
+def join_environment(df: pd.DataFrame, station: str, kind: str, columns=None,
+                     tolerance: str = "3h", date_col: str = "Date / Heure") -> pd.DataFrame:
+    """
+    Ajoute aux mesures d'une station les valeurs météo / vagues les plus proches
+    dans le temps (à tolerance près). Les lignes sans date sont conservées telles quelles.
+    """
+    series = load_environment_series(station, kind, columns=columns)
+    if series.empty or date_col not in df.columns:
+        return df
+
+    dated = df[df[date_col].notna()].sort_values(date_col)
+    joined = pd.merge_asof(
+        dated, series, left_on=date_col, right_on="date",
+        direction="nearest", tolerance=pd.Timedelta(tolerance)
+    ).drop(columns=["date"])
+    joined.index = dated.index
+    return pd.concat([joined, df[df[date_col].isna()]]).sort_index()
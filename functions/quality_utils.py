@@ -0,0 +1,160 @@
+import warnings
+from bisect import insort, bisect_left
+from collections import deque
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Contrôle des valeurs saisies : médiane et MAD (écart absolu médian) glissants
+WINDOW = 15          # nombre de mesures précédentes prises en compte
+MIN_HISTORY = 5      # en dessous, pas de contrôle possible
+# Calibrés sur l'archive Database/resultats_photos.xlsx : la MAD médiane d'une station y
+# est de 5 cm (précision de lecture de la règle) ; avec ces valeurs, 27 des 744 mesures
+# contrôlables sont signalées, pour un écart médian à la référence d'environ 50 cm.
+THRESHOLD = 5.0      # score robuste |x - médiane| / (1.4826 * MAD) au-delà duquel on alerte
+MAD_SCALE = 1.4826   # rend la MAD comparable à un écart-type pour une loi normale
+MIN_MAD_CM = 5.0     # plancher : une série très stable n'alerte pas pour quelques cm
+NEIGHBOUR_COUNT = 3  # stations voisines consultées pour confirmer un écart
+NEIGHBOUR_DAYS = 2   # tolérance entre les dates de prise de vue des voisines
+
+
+class RunningStats:
+    """
+    Fenêtre glissante des WINDOW dernières valeurs d'une station, gardée triée.
+    La fenêtre étant bornée, ajout et contrôle sont en temps constant.
+    """
+
+    def __init__(self, window: int = WINDOW):
+        self.values = deque(maxlen=window)
+        self.sorted = []
+
+    def __len__(self):
+        return len(self.values)
+
+    def push(self, value: float):
+        if len(self.values) == self.values.maxlen:
+            oldest = self.values[0]
+            del self.sorted[bisect_left(self.sorted, oldest)]
+        self.values.append(value)
+        insort(self.sorted, value)
+
+    def median(self) -> float:
+        n = len(self.sorted)
+        mid = n // 2
+        return self.sorted[mid] if n % 2 else (self.sorted[mid - 1] + self.sorted[mid]) / 2.0
+
+    def mad(self) -> float:
+        med = self.median()
+        return float(np.median(np.abs(np.asarray(self.sorted) - med)))
+
+    def score(self, value: float):
+        """Score robuste de value par rapport à la fenêtre, ou None si l'historique est trop court."""
+        if len(self) < MIN_HISTORY:
+            return None
+        scale = MAD_SCALE * max(self.mad(), MIN_MAD_CM)
+        return abs(value - self.median()) / scale
+
+
+class OutlierMonitor:
+    """Statistiques glissantes par station, alimentées à chaque sauvegarde."""
+
+    def __init__(self, window: int = WINDOW):
+        self.window = window
+        self.stats = {}
+
+    @classmethod
+    def from_table(cls, table: pd.DataFrame, window: int = WINDOW):
+        """Initialise les fenêtres avec les dernières mesures (ordre chronologique) de chaque station."""
+        monitor = cls(window)
+        measured = table.loc[table["result_cm"].notna()].sort_values(["station", "timestamp"])
+        for station, values in measured.groupby("station")["result_cm"]:
+            for value in values.to_numpy()[-window:]:
+                monitor.record(station, float(value))
+        return monitor
+
+    def _station(self, station):
+        return self.stats.setdefault(station.strip().upper(), RunningStats(self.window))
+
+    def check(self, station: str, value: float):
+        """
+        Retourne (improbable, score, médiane) pour une nouvelle valeur de la station.
+        improbable est False tant que l'historique est insuffisant.
+        """
+        stats = self._station(station)
+        score = stats.score(value)
+        if score is None:
+            return False, None, None
+        return score > THRESHOLD, score, stats.median()
+
+    def record(self, station: str, value: float):
+        self._station(station).push(value)
+
+
+def flag_outliers(table: pd.DataFrame, window: int = WINDOW) -> pd.DataFrame:
+    """
+    Même contrôle que OutlierMonitor, appliqué à tout l'historique en une passe vectorisée :
+    chaque mesure est comparée aux window mesures précédentes de sa station.
+    Retourne les mesures avec les colonnes mediane_ref, mad_ref, score et aberrante.
+    """
+    measured = table.loc[table["result_cm"].notna()].sort_values(["station", "timestamp"])
+    measured = measured.reset_index(drop=True)
+    if measured.empty:
+        return measured.assign(mediane_ref=np.array([], dtype=float), mad_ref=np.array([], dtype=float),
+                               score=np.array([], dtype=float), aberrante=np.array([], dtype=bool))
+
+    # Série unique où chaque station est précédée de window NaN : une fenêtre
+    # ne déborde donc jamais sur la station précédente.
+    values = measured["result_cm"].to_numpy(dtype=float)
+    starts = np.flatnonzero(np.r_[True, measured["station"].to_numpy()[1:] != measured["station"].to_numpy()[:-1]])
+    padded = np.insert(values, np.repeat(starts, window), np.nan)
+    positions = np.arange(len(values)) + window * (np.searchsorted(starts, np.arange(len(values)), side="right"))
+    windows = sliding_window_view(padded, window)[positions - window]  # les window valeurs précédentes
+
+    history = np.sum(~np.isnan(windows), axis=1)
+    with warnings.catch_warnings():
+        # Fenêtres entièrement vides en début de station : médiane NaN, attendu
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        median = np.nanmedian(windows, axis=1)
+        mad = np.nanmedian(np.abs(windows - median[:, None]), axis=1)
+    score = np.abs(values - median) / (MAD_SCALE * np.maximum(mad, MIN_MAD_CM))
+    score = np.where(history >= MIN_HISTORY, score, np.nan)
+
+    return measured.assign(
+        mediane_ref=np.where(history >= MIN_HISTORY, median, np.nan),
+        mad_ref=np.where(history >= MIN_HISTORY, mad, np.nan),
+        score=score,
+        aberrante=score > THRESHOLD,
+    )
+
+
+def cross_check_neighbours(flagged: pd.DataFrame, index, k: int = NEIGHBOUR_COUNT,
+                           days: int = NEIGHBOUR_DAYS) -> pd.DataFrame:
+    """
+    Confronte chaque valeur aberrante de flag_outliers à celles des k stations voisines
+    (StationIndex.neighbours) : un écart de même sens chez une voisine, à moins de days
+    jours, signale plutôt un vrai événement (tempête) qu'une erreur de saisie.
+    Ajoute les colonnes voisines et confirmee_voisines.
+    """
+    flagged = flagged.assign(voisines="", confirmee_voisines=False)
+    mask = flagged["aberrante"].to_numpy(dtype=bool)
+    if not mask.any():
+        return flagged
+    outliers = flagged.loc[mask]
+    signs = np.sign(outliers["result_cm"] - outliers["mediane_ref"]).to_numpy()
+
+    events = {}
+    for station, ts, sign in zip(outliers["station"], outliers["timestamp"], signs):
+        if pd.notna(ts):
+            events.setdefault(station, []).append((ts, sign))
+
+    window = pd.Timedelta(days=days)
+    voisines, confirmed = [], []
+    for station, ts, sign in zip(outliers["station"], outliers["timestamp"], signs):
+        near = [code for code, _ in index.neighbours(station, k)]
+        voisines.append(", ".join(near))
+        confirmed.append(pd.notna(ts) and any(
+            s == sign and abs(t - ts) <= window for code in near for t, s in events.get(code, [])
+        ))
+    flagged.loc[mask, "voisines"] = voisines
+    flagged.loc[mask, "confirmee_voisines"] = confirmed
+    return flagged
@@ -1,10 +1,19 @@
 import os
+import json
+import numpy as np
 import pandas as pd
 
+from functions.excel_utils import NON_STATION_SHEETS
+
 # Chemin vers Ram2022.xlsx dans Database
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
 RAM_XLSX_PATH = os.path.join(BASE_DIR, "Database", "Ram2022.xlsx")
 
+# Jeu de données Parquet partitionné par station, écrit à côté du classeur
+PARQUET_DIR_NAME = "resultats_photos_parquet"
+PARQUET_MANIFEST = "_manifest.json"  # préfixe "_" : ignoré par les lecteurs Parquet
+PARQUET_COLUMNS = ["station", "photo", "timestamp", "result_cm", "sand_height_m", "status"]
+
 
 def load_summary(excel_file: str) -> pd.DataFrame:
     """
@@ -19,11 +28,12 @@ def load_summary(excel_file: str) -> pd.DataFrame:
     return df
 
 
-def load_station_data(excel_file: str, sheet_name: str) -> pd.DataFrame:
+def _format_station_frame(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Charge la feuille d'une station et formate les colonnes Date / Heure et Résultat.
+    Formate les colonnes Date / Heure et Résultat d'une feuille station.
+    Accepte l'ancienne colonne unique "Date / Heure" comme les colonnes séparées "Date" et "Heure".
+    La colonne Statut conserve l'information perdue par la conversion numérique (INEXPLOITABLE).
     """
-    df = pd.read_excel(excel_file, sheet_name=sheet_name)
     if "Date / Heure" in df.columns:
         df["Date / Heure"] = pd.to_datetime(
             df["Date / Heure"],
@@ -31,11 +41,60 @@ def load_station_data(excel_file: str, sheet_name: str) -> pd.DataFrame:
             dayfirst=True,
             errors="coerce"
         )
+    elif "Date" in df.columns and "Heure" in df.columns:
+        df["Date / Heure"] = pd.to_datetime(
+            df["Date"].astype(str) + " " + df["Heure"].astype(str),
+            format="%d/%m/%Y %H:%M:%S",
+            errors="coerce"
+        )
     if "Résultat" in df.columns:
-        df["Résultat"] = pd.to_numeric(df["Résultat"], errors="coerce")
+        raw = df["Résultat"]
+        df["Résultat"] = pd.to_numeric(raw, errors="coerce")
+        unusable = raw.astype(str).str.strip().str.upper() == "INEXPLOITABLE"
+        df["Statut"] = np.where(
+            df["Résultat"].notna(), "mesuré",
+            np.where(unusable, "inexploitable", "à mesurer")
+        )
     return df
 
 
+def load_station_data(excel_file: str, sheet_name: str) -> pd.DataFrame:
+    """
+    Charge la feuille d'une station et formate les colonnes Date / Heure et Résultat.
+    """
+    return _format_station_frame(pd.read_excel(excel_file, sheet_name=sheet_name))
+
+
+def load_all_station_data(excel_file: str, stations=None) -> tuple:
+    """
+    Lit toutes les feuilles du classeur (ou seulement Résumé et les stations demandées)
+    en une seule passe. Retourne (summary, { feuille_station: DataFrame formaté }).
+    """
+    sheet_names = None if stations is None else ["Résumé"] + list(stations)
+    sheets = pd.read_excel(excel_file, sheet_name=sheet_names)
+    summary = sheets.pop("Résumé", pd.DataFrame(columns=["Station", "Z_CC49"]))
+    for name in NON_STATION_SHEETS:
+        sheets.pop(name, None)
+    if "Station" in summary.columns:
+        summary["Station"] = summary["Station"].astype(str).str.strip().str.upper()
+    return summary, {name: _format_station_frame(df) for name, df in sheets.items()}
+
+
+def station_reference(code: str, ram_info: dict, summary: pd.DataFrame):
+    """
+    Altitude Z_CC49 (m NGF) du poteau d'une station : Ram2022 en priorité, sinon la feuille Résumé.
+    """
+    z_ref = ram_info.get(code, {}).get("Z_CC49")
+    if z_ref is not None and pd.notna(z_ref):
+        return float(z_ref)
+    row = summary[summary["Station"] == code] if "Station" in summary.columns else summary.iloc[0:0]
+    if not row.empty:
+        z = pd.to_numeric(str(row["Z_CC49"].iloc[0]).replace(",", "."), errors="coerce")
+        if pd.notna(z):
+            return float(z)
+    return None
+
+
 def load_ram_info() -> dict:
     """
     Lit Ram2022.xlsx et retourne un mapping :
@@ -60,4 +119,111 @@ def load_ram_info() -> dict:
     return mapping
 
 
+def build_measurement_table(summary: pd.DataFrame, station_frames: dict, ram_info: dict = None) -> pd.DataFrame:
+    """
+    Met toutes les stations au format long, une ligne par photo :
+    station, photo, timestamp, result_cm, sand_height_m (m NGF depuis Z_CC49), status.
+    """
+    ram_info = ram_info if ram_info is not None else load_ram_info()
+    parts = []
+    for sheet, df in station_frames.items():
+        if "Nom de la photo" not in df.columns or "Résultat" not in df.columns:
+            continue
+        code = sheet.strip().upper()
+        z_ref = station_reference(code, ram_info, summary)
+        result = df["Résultat"].astype("float64")
+        parts.append(pd.DataFrame({
+            "station": code,
+            "photo": df["Nom de la photo"].astype(str),
+            "timestamp": df.get("Date / Heure", pd.Series(pd.NaT, index=df.index)),
+            "result_cm": result,
+            "sand_height_m": z_ref - result / 100.0 if z_ref is not None else np.nan,
+            "status": df["Statut"],
+        }))
+    if not parts:
+        return pd.DataFrame(columns=PARQUET_COLUMNS)
+    return pd.concat(parts, ignore_index=True)
+
+
+def parquet_dir_for(excel_file: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(excel_file)), PARQUET_DIR_NAME)
+
+
+def write_parquet_partitions(table: pd.DataFrame, dataset_dir: str) -> list:
+    """
+    Écrit la table longue dans le jeu Parquet partitionné par station (station=XXX/part-0.parquet).
+    Seules les partitions dont le contenu a changé depuis le dernier export sont réécrites.
+    Retourne la liste des stations réécrites.
+    """
+    os.makedirs(dataset_dir, exist_ok=True)
+    manifest_path = os.path.join(dataset_dir, PARQUET_MANIFEST)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+
+    written = []
+    for code, part in table.groupby("station", sort=False):
+        part = part.drop(columns=["station"]).reset_index(drop=True)
+        digest = str(int(pd.util.hash_pandas_object(part, index=False).sum()))
+        if manifest.get(code) == digest:
+            continue
+        part_dir = os.path.join(dataset_dir, f"station={code}")
+        os.makedirs(part_dir, exist_ok=True)
+        tmp = os.path.join(part_dir, ".part-0.parquet.tmp")
+        part.to_parquet(tmp, index=False)
+        os.replace(tmp, os.path.join(part_dir, "part-0.parquet"))
+        manifest[code] = digest
+        written.append(code)
 
+    if written:
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+    return written
+
+
+def load_parquet_dataset(dataset_dir: str, columns=None, stations=None) -> pd.DataFrame:
+    """
+    Relit le jeu Parquet en mémoire mappée, en ne décodant que les colonnes
+    et les partitions (stations) demandées.
+    """
+    import pyarrow.parquet as pq
+
+    filters = None
+    if stations is not None:
+        filters = [("station", "in", [s.strip().upper() for s in stations])]
+    if columns is not None and "station" not in columns:
+        columns = list(columns) + ["station"]
+    table = pq.read_table(
+        dataset_dir, columns=columns, filters=filters,
+        partitioning="hive", memory_map=True
+    )
+    df = table.to_pandas()
+    df["station"] = df["station"].astype(str)
+    return df
+
+
+def minmax_decimate(x: np.ndarray, y: np.ndarray, n_bins: int) -> np.ndarray:
+    """
+    Décimation min/max pour l'affichage : x (trié) est découpé en n_bins intervalles
+    de même largeur et l'on ne garde, dans chacun, que les points de y minimal et maximal.
+    Les pics restent visibles quel que soit le zoom. Retourne les indices conservés, triés.
+    """
+    n = len(x)
+    if n <= 2 * n_bins:
+        return np.arange(n)
+    valid = ~np.isnan(y)
+    idx = np.flatnonzero(valid)
+    if len(idx) <= 2 * n_bins:
+        return idx
+    xv, yv = x[idx], y[idx]
+    span = xv[-1] - xv[0]
+    if span <= 0:
+        return idx[np.unique([np.argmin(yv), np.argmax(yv)])]
+    bins = np.minimum(((xv - xv[0]) / span * n_bins).astype(int), n_bins - 1)
+    # Tri par (intervalle, y) : premier élément = min, dernier = max de chaque intervalle
+    order = np.lexsort((yv, bins))
+    sorted_bins = bins[order]
+    first = np.flatnonzero(np.r_[True, sorted_bins[1:] != sorted_bins[:-1]])
+    last = np.r_[first[1:] - 1, len(order) - 1]
+    return idx[np.unique(np.concatenate([order[first], order[last]]))]
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # scipy absent : recherche exhaustive, suffisante pour ~150 stations
+    cKDTree = None
+
+from functions.excel_utils import load_station_coordinates
+from functions.result_utilis import load_ram_info, station_reference
+
+EARTH_RADIUS_KM = 6371.0
+
+
+class StationIndex:
+    """
+    Index spatial des stations de station.csv.
+    Les coordonnées sont projetées une fois (équirectangulaire centrée sur le réseau,
+    en km), ce qui est précis à quelques mètres près à l'échelle de la côte.
+    """
+
+    def __init__(self, coords: dict = None):
+        coords = coords if coords is not None else load_station_coordinates()
+        self.codes = list(coords)
+        latlon = np.array([coords[c] for c in self.codes], dtype=float).reshape(-1, 2)
+        self.lat0 = float(latlon[:, 0].mean()) if len(latlon) else 0.0
+        self.xy = self._project(latlon[:, 0], latlon[:, 1])
+        self._positions = {code: i for i, code in enumerate(self.codes)}
+        self._tree = cKDTree(self.xy) if cKDTree is not None and len(self.xy) else None
+
+    def _project(self, lat, lon):
+        lat = np.radians(np.asarray(lat, dtype=float))
+        lon = np.radians(np.asarray(lon, dtype=float))
+        x = EARTH_RADIUS_KM * lon * np.cos(np.radians(self.lat0))
+        y = EARTH_RADIUS_KM * lat
+        return np.column_stack([x, y])
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, code):
+        return code.strip().upper() in self._positions
+
+    def within(self, lat: float, lon: float, radius_km: float) -> list:
+        """Stations à moins de radius_km du point (lat, lon), triées par distance : [(code, km)]."""
+        point = self._project([lat], [lon])[0]
+        if self._tree is not None:
+            idx = np.asarray(self._tree.query_ball_point(point, radius_km), dtype=int)
+        else:
+            dist = np.hypot(*(self.xy - point).T)
+            idx = np.flatnonzero(dist <= radius_km)
+        dist = np.hypot(*(self.xy[idx] - point).T) if len(idx) else np.array([])
+        order = np.argsort(dist)
+        return [(self.codes[idx[i]], float(dist[i])) for i in order]
+
+    def _nearest_xy(self, point, k):
+        k = min(k, len(self.codes))
+        if k == 0:
+            return []
+        if self._tree is not None:
+            dist, idx = self._tree.query(point, k=k)
+            dist, idx = np.atleast_1d(dist), np.atleast_1d(idx)
+        else:
+            all_dist = np.hypot(*(self.xy - point).T)
+            idx = np.argsort(all_dist)[:k]
+            dist = all_dist[idx]
+        return [(self.codes[i], float(d)) for i, d in zip(idx, dist)]
+
+    def nearest(self, lat: float, lon: float, k: int = 1) -> list:
+        """Les k stations les plus proches du point (lat, lon) : [(code, km)]."""
+        return self._nearest_xy(self._project([lat], [lon])[0], k)
+
+    def neighbours(self, code: str, k: int = 3) -> list:
+        """Les k voisines d'une station (elle-même exclue) : [(code, km)]."""
+        code = code.strip().upper()
+        if code not in self._positions:
+            return []
+        point = self.xy[self._positions[code]]
+        return [(c, d) for c, d in self._nearest_xy(point, k + 1) if c != code][:k]
+
+
+def station_overview(summary: pd.DataFrame, station_frames: dict, ram_info: dict = None) -> pd.DataFrame:
+    """
+    Une ligne par station : dernière hauteur de sable (m NGF), date de cette mesure
+    et tendance (m/an, régression linéaire) calculées à partir des données déjà chargées.
+    """
+    ram_info = ram_info if ram_info is not None else load_ram_info()
+    rows = []
+    for sheet, df in station_frames.items():
+        code = sheet.strip().upper()
+        z_ref = station_reference(code, ram_info, summary)
+        if z_ref is None or "Résultat" not in df.columns or "Date / Heure" not in df.columns:
+            continue
+        valid = df.loc[df["Date / Heure"].notna() & df["Résultat"].notna()].sort_values("Date / Heure")
+        if valid.empty:
+            continue
+        heights = z_ref - valid["Résultat"].to_numpy() / 100.0
+        years = (valid["Date / Heure"] - valid["Date / Heure"].iloc[0]).dt.total_seconds().to_numpy() / (365.25 * 86400)
+        trend = np.polyfit(years, heights, 1)[0] if np.ptp(years) > 0 else np.nan
+        rows.append({
+            "Station": code,
+            "Dernière hauteur (m)": heights[-1],
+            "Dernière mesure": valid["Date / Heure"].iloc[-1],
+            "Tendance (m/an)": trend,
+        })
+    return pd.DataFrame(rows, columns=["Station", "Dernière hauteur (m)", "Dernière mesure", "Tendance (m/an)"])
@@ -0,0 +1,95 @@
+import os
+import time
+import hashlib
+from PyQt5.QtCore import Qt, QSize
+from PyQt5.QtGui import QImage, QImageReader
+
+# Cache disque des vignettes dans Database/cache/thumbnails
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+THUMB_DIR = os.path.join(BASE_DIR, "Database", "cache", "thumbnails")
+THUMB_SIZE = 160
+THUMB_CACHE_MAX_MB = 500        # au-delà, les vignettes les moins récemment utilisées sont supprimées
+THUMB_CACHE_MAX_AGE_DAYS = 180  # vignette inutilisée depuis plus longtemps : supprimée
+
+
+def thumbnail_cache_path(image_path: str, size: int = THUMB_SIZE) -> str:
+    """
+    Chemin de la vignette en cache. La clé combine chemin absolu, date de modification
+    et taille du fichier : une photo remplacée produit une nouvelle vignette.
+    """
+    st = os.stat(image_path)
+    key = f"{os.path.abspath(image_path)}|{st.st_mtime_ns}|{st.st_size}|{size}"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return os.path.join(THUMB_DIR, digest[:2], digest + ".jpg")
+
+
+def load_thumbnail(image_path: str, size: int = THUMB_SIZE) -> QImage:
+    """
+    Retourne la vignette d'une photo (QImage, utilisable hors du thread graphique).
+    Lue depuis le cache disque si elle existe, sinon décodée directement à taille
+    réduite (QImageReader.setScaledSize évite de décoder la photo en pleine résolution).
+    """
+    try:
+        cached = thumbnail_cache_path(image_path, size)
+    except OSError:
+        return QImage()
+    if os.path.exists(cached):
+        image = QImage(cached)
+        if not image.isNull():
+            try:
+                os.utime(cached)  # date d'utilisation pour l'élagage (atime peu fiable : noatime)
+            except OSError:
+                pass
+            return image
+
+    reader = QImageReader(image_path)
+    reader.setAutoTransform(True)
+    full = reader.size()
+    if full.isValid():
+        reader.setScaledSize(full.scaled(QSize(size, size), Qt.KeepAspectRatio))
+    image = reader.read()
+    if image.isNull():
+        return image
+    if image.width() > size or image.height() > size:
+        image = image.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+    os.makedirs(os.path.dirname(cached), exist_ok=True)
+    tmp = cached + ".tmp"
+    if image.save(tmp, "JPG", 80):
+        os.replace(tmp, cached)
+    return image
+
+
+def prune_thumbnail_cache(max_mb: float = THUMB_CACHE_MAX_MB,
+                          max_age_days: float = THUMB_CACHE_MAX_AGE_DAYS) -> int:
+    """
+    Élague le cache disque : les vignettes d'une photo remplacée ou resynchronisée ne
+    sont plus jamais relues (la clé change). Supprime celles inutilisées depuis
+    max_age_days, puis les moins récemment utilisées jusqu'à repasser sous max_mb.
+    Retourne le nombre de fichiers supprimés.
+    """
+    entries = []
+    for sub in os.scandir(THUMB_DIR) if os.path.isdir(THUMB_DIR) else []:
+        if not sub.is_dir():
+            continue
+        for entry in os.scandir(sub.path):
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, entry.path))
+
+    entries.sort()  # les plus anciennement utilisées d'abord
+    total = sum(size for _, size, _ in entries)
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    for mtime, size, path in entries:
+        if mtime >= cutoff and total <= max_mb * 1024 * 1024:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    return removed
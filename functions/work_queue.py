@@ -0,0 +1,297 @@
+import os
+import sqlite3
+import time
+from contextlib import contextmanager, nullcontext
+from openpyxl import load_workbook
+
+from functions.excel_utils import NON_STATION_SHEETS, save_workbook
+
+QUEUE_DB_NAME = "file_attente.db"
+DEFAULT_LEASE_S = 15 * 60
+ORPHAN = -1  # valeur de merged : résultat dont la feuille ou la photo n'existe plus dans l'Excel
+
+
+def queue_path_for(excel_file: str) -> str:
+    """La file partagée est stockée à côté du classeur, sur le même lecteur réseau."""
+    return os.path.join(os.path.dirname(os.path.abspath(excel_file)), QUEUE_DB_NAME)
+
+
+def workbook_lock_for(excel_file: str):
+    """
+    Verrou à prendre pour toute écriture du classeur : celui de la file partagée si
+    elle existe à côté du classeur (mode multi-opérateur), sinon aucun.
+    """
+    db_path = queue_path_for(excel_file)
+    if not os.path.exists(db_path):
+        return nullcontext()
+    return WorkQueue(db_path).workbook_lock()
+
+
+def _result_column(ws):
+    """Index (1-based) de la colonne Résultat, quelle que soit la version de la feuille."""
+    for cell in next(ws.iter_rows(min_row=1, max_row=1)):
+        if cell.value == "Résultat":
+            return cell.column
+    return None
+
+
+def _is_empty(value):
+    return value is None or str(value).strip() == ""
+
+
+class WorkQueue:
+    """
+    File de travail multi-opérateurs dans une base SQLite partagée.
+    Chaque photo à mesurer est prêtée (bail) à un opérateur pour une durée limitée ;
+    le bail est renouvelé sur la photo affichée et seul son détenteur peut enregistrer
+    le résultat. Les résultats sont fusionnés dans le classeur par lots, sous le verrou
+    d'écriture SQLite qui protège aussi toutes les autres écritures du classeur.
+    """
+
+    def __init__(self, db_path: str, lease_s: int = DEFAULT_LEASE_S):
+        self.db_path = db_path
+        self.lease_s = lease_s
+        self._init_db()
+
+    def _connect(self):
+        # isolation_level=None : transactions explicites (BEGIN IMMEDIATE)
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    @contextmanager
+    def workbook_lock(self):
+        """
+        Verrou d'écriture exclusif (BEGIN IMMEDIATE) à tenir pendant toute lecture-
+        modification-sauvegarde du classeur partagé. Fournit la connexion, dont la
+        transaction est validée à la sortie du bloc.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS photos (
+                station TEXT NOT NULL,
+                photo TEXT NOT NULL,
+                row_idx INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'todo',
+                operator TEXT,
+                lease_expires REAL,
+                result TEXT,
+                updated_at REAL,
+                merged INTEGER NOT NULL DEFAULT 1,
+                PRIMARY KEY (station, photo)
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_photos_status ON photos(status, lease_expires)")
+        conn.close()
+
+    def sync_from_excel(self, excel_file: str) -> int:
+        """
+        Ajoute à la file les photos sans résultat du classeur et clôt celles qui en ont un.
+        Retourne le nombre de photos encore à mesurer.
+        """
+        wb = load_workbook(excel_file, read_only=True)
+        todo, done = [], []
+        for sheet in wb.sheetnames:
+            if sheet in NON_STATION_SHEETS:
+                continue
+            ws = wb[sheet]
+            col = _result_column(ws)
+            if col is None:
+                continue
+            for idx, row in enumerate(ws.iter_rows(min_row=2, values_only=True)):
+                if not row or _is_empty(row[0]):
+                    continue
+                value = row[col - 1] if len(row) >= col else None
+                (todo if _is_empty(value) else done).append((sheet, str(row[0]), idx))
+        wb.close()
+
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT OR IGNORE INTO photos(station, photo, row_idx) VALUES (?, ?, ?)", todo
+            )
+            conn.executemany(
+                "UPDATE photos SET row_idx=? WHERE station=? AND photo=?",
+                [(idx, station, photo) for station, photo, idx in todo + done]
+            )
+            conn.executemany(
+                "UPDATE photos SET status='done', operator=NULL, lease_expires=NULL "
+                "WHERE station=? AND photo=? AND status!='done'",
+                [(station, photo) for station, photo, _ in done]
+            )
+            remaining = conn.execute("SELECT COUNT(*) FROM photos WHERE status!='done'").fetchone()[0]
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return remaining
+
+    def add_photos(self, items: list):
+        """Ajoute à la file des photos nouvellement arrivées : [(station, row_idx, photo)]."""
+        conn = self._connect()
+        conn.executemany(
+            "INSERT OR IGNORE INTO photos(station, row_idx, photo) VALUES (?, ?, ?)", items
+        )
+        conn.close()
+
+    def lease(self, operator: str, count: int = 20) -> list:
+        """
+        Prête jusqu'à count photos à l'opérateur : les siennes encore valides, puis les
+        photos libres ou dont le bail a expiré. Retourne [(station, row_idx, photo)].
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                """
+                SELECT station, row_idx, photo FROM photos
+                WHERE status='todo'
+                   OR (status='leased' AND (operator=? OR lease_expires < ?))
+                ORDER BY (operator IS ?) DESC, station, row_idx
+                LIMIT ?
+                """,
+                (operator, now, operator, count)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE photos SET status='leased', operator=?, lease_expires=? WHERE station=? AND photo=?",
+                [(operator, now + self.lease_s, station, photo) for station, _, photo in rows]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return [tuple(r) for r in rows]
+
+    def claim(self, operator: str, station: str, row_idx: int, photo: str, measured: bool = False) -> bool:
+        """
+        Prend (ou renouvelle) le bail d'une photo avant de l'afficher. La photo est ajoutée
+        à la file si elle n'y est pas encore (mesurée avant la création de la file, arrivée
+        depuis la dernière synchronisation). Une photo déjà mesurée garde son statut :
+        le bail protège seulement sa remesure. Retourne False si un autre opérateur
+        détient un bail valide sur cette photo.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR IGNORE INTO photos(station, photo, row_idx, status) VALUES (?, ?, ?, ?)",
+                (station, photo, row_idx, "done" if measured else "todo")
+            )
+            claimed = conn.execute(
+                """
+                UPDATE photos
+                SET status=CASE WHEN status='done' THEN 'done' ELSE 'leased' END,
+                    operator=?, lease_expires=?
+                WHERE station=? AND photo=?
+                  AND (lease_expires IS NULL OR lease_expires < ? OR operator=?)
+                """,
+                (operator, now + self.lease_s, station, photo, now, operator)
+            ).rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return claimed == 1
+
+    def release(self, operator: str, items: list):
+        """Rend à la file les photos prêtées et non traitées (fermeture, changement d'opérateur)."""
+        conn = self._connect()
+        conn.executemany(
+            "UPDATE photos SET status=CASE WHEN status='done' THEN 'done' ELSE 'todo' END, "
+            "operator=CASE WHEN status='done' THEN operator END, "
+            "lease_expires=NULL WHERE station=? AND photo=? AND lease_expires IS NOT NULL AND operator=?",
+            [(station, photo, operator) for station, _, photo in items]
+        )
+        conn.close()
+
+    def submit(self, station: str, photo: str, value, operator: str):
+        """
+        Enregistre atomiquement le résultat d'une photo, en attente de fusion dans le classeur.
+        L'opérateur doit détenir le bail de la photo (voir claim) : sinon RuntimeError,
+        un autre opérateur l'ayant reprise entre-temps.
+        """
+        conn = self._connect()
+        updated = conn.execute(
+            "UPDATE photos SET status='done', result=?, lease_expires=NULL, updated_at=?, merged=0 "
+            "WHERE station=? AND photo=? AND operator=? AND lease_expires IS NOT NULL",
+            (str(value), time.time(), station, photo, operator)
+        ).rowcount
+        conn.close()
+        if updated != 1:
+            raise RuntimeError(
+                f"{station} / {photo} : bail perdu, la photo a été reprise par un autre opérateur."
+            )
+
+    def merge_into_excel(self, excel_file: str) -> int:
+        """
+        Écrit dans le classeur tous les résultats non encore fusionnés (de tous les
+        opérateurs), en une seule ouverture / sauvegarde sous workbook_lock. Appelée
+        périodiquement et en fin de lot, pas à chaque mesure. Le classeur n'est réécrit
+        que si au moins un résultat y trouve sa ligne ; les autres sont marqués ORPHAN.
+        Retourne le nombre de résultats fusionnés.
+        """
+        with self.workbook_lock() as conn:
+            pending = conn.execute(
+                "SELECT station, photo, result FROM photos WHERE status='done' AND merged=0"
+            ).fetchall()
+            if not pending:
+                return 0
+
+            wb = load_workbook(excel_file)
+            merged, orphans = [], []
+            by_station = {}
+            for station, photo, result in pending:
+                by_station.setdefault(station, []).append((photo, result))
+            for station, items in by_station.items():
+                ws = wb[station] if station in wb.sheetnames else None
+                col = _result_column(ws) if ws is not None else None
+                if col is None:
+                    orphans.extend((station, photo) for photo, _ in items)
+                    continue
+                # Recherche par nom de photo : insensible aux décalages de lignes
+                rows = {r[0].value: r[0].row for r in ws.iter_rows(min_row=2, max_col=1)}
+                for photo, result in items:
+                    if photo in rows:
+                        ws.cell(row=rows[photo], column=col, value=_excel_value(result))
+                        merged.append((station, photo))
+                    else:
+                        orphans.append((station, photo))
+
+            if merged:
+                save_workbook(wb, excel_file)
+                conn.executemany("UPDATE photos SET merged=1 WHERE station=? AND photo=?", merged)
+            if orphans:
+                # Feuille ou photo retirée du classeur : mis de côté plutôt que retenté à chaque fusion
+                conn.executemany(
+                    f"UPDATE photos SET merged={ORPHAN} WHERE station=? AND photo=?", orphans
+                )
+                print(f"{len(orphans)} résultat(s) sans ligne dans l'Excel, non fusionné(s) : "
+                      + ", ".join(f"{s}/{p}" for s, p in orphans))
+        return len(merged)
+
+
+def _excel_value(result):
+    """Les résultats numériques sont réécrits comme nombres, le reste (INEXPLOITABLE) comme texte."""
+    try:
+        return float(result)
+    except (TypeError, ValueError):
+        return result
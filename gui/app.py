@@ -1,10 +1,12 @@
 # gui/app.py
 
 import sys
-from PyQt5.QtWidgets import QApplication, QMainWindow, QTabWidget
+from PyQt5.QtWidgets import QApplication, QMainWindow, QTabWidget, QMessageBox
+from gui.dataset_model import StationDataset
 from gui.excel_tab import ExcelTab
 from gui.measure_tab import MeasureTab
 from gui.result_tab import ResultTab
+from gui.contact_sheet_tab import ContactSheetTab
 
 
 def run_app():
@@ -14,19 +16,39 @@ def run_app():
     main.setWindowTitle("Altiplage")
     tabs = QTabWidget()
 
+    # Classeur chargé une seule fois et partagé entre les onglets
+    dataset = StationDataset()
+
     excel_tab = ExcelTab()
     measure_tab = MeasureTab()
     result_tab = ResultTab()
+    contact_tab = ContactSheetTab()
+    excel_tab.set_dataset(dataset)
+    measure_tab.set_dataset(dataset)
+    result_tab.set_dataset(dataset)
 
     # Connecter les callbacks
     def update_excel(excel_file, input_folder):
+        try:
+            dataset.load(excel_file)
+        except Exception as e:
+            QMessageBox.warning(main, "Erreur", f"Impossible de lire l'Excel : {e}")
+        measure_tab.flush_parquet_export()
         measure_tab.set_excel_file_and_folder(excel_file, input_folder)
-        result_tab.set_excel_file(excel_file)
+        result_tab.set_excel_file(excel_file, input_folder)
+        contact_tab.set_input_folder(input_folder)
+
+    def open_in_measure(station, photo):
+        if measure_tab.open_photo(station, photo):
+            tabs.setCurrentWidget(measure_tab)
+
+    contact_tab.photo_activated.connect(open_in_measure)
 
     main.update_excel_file_and_folder = update_excel
 
     tabs.addTab(excel_tab, "Excel")
     tabs.addTab(measure_tab, "Mesure")
+    tabs.addTab(contact_tab, "Planche contact")
     tabs.addTab(result_tab, "Résultats")
 
     main.setCentralWidget(tabs)
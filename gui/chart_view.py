@@ -0,0 +1,120 @@
+# gui/chart_view.py
+
+import numpy as np
+import pandas as pd
+import matplotlib.dates as mdates
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg, NavigationToolbar2QT
+from PyQt5.QtWidgets import QWidget, QVBoxLayout
+from functions.result_utilis import minmax_decimate
+
+DECIMATION_BINS = 1500   # ~ un min et un max par pixel d'un graphique plein écran
+MARKER_MAX_POINTS = 500  # au-delà, la série est tracée sans marqueurs
+
+
+class StationChartView(QWidget):
+    """
+    Graphique interactif d'une station (zoom / déplacement via la barre d'outils).
+    Seuls les points min/max de chaque intervalle de la fenêtre visible sont tracés ;
+    la série est redécimée à chaque changement de zoom. Le curseur qui suit la
+    souris est redessiné par blitting, sans retracer tout le graphique.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.figure = Figure(figsize=(8, 4), tight_layout=True)
+        self.canvas = FigureCanvasQTAgg(self.figure)
+        self.toolbar = NavigationToolbar2QT(self.canvas, self)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.toolbar)
+        layout.addWidget(self.canvas)
+
+        self.ax = self.figure.add_subplot(111)
+        self.x = np.array([])
+        self.y = np.array([])
+        self.line = None
+        self.cursor = None
+        self.cursor_text = None
+        self._background = None
+        self._updating = False
+        self._xlim_cid = None
+
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+        self.canvas.mpl_connect("motion_notify_event", self._on_motion)
+
+    def show_series(self, title, dates, values, ylabel, ref_lines=()):
+        """
+        Affiche une série datée. ref_lines : [(y, style, couleur, libellé)],
+        les mêmes lignes de référence que les graphiques exportés.
+        """
+        self.ax.clear()
+        self.x = mdates.date2num(pd.DatetimeIndex(dates).to_pydatetime())
+        self.y = np.asarray(values, dtype=float)
+
+        self.ax.set_title(title, fontweight="bold")
+        self.line, = self.ax.plot([], [], color="C1", linewidth=1, marker="o", markersize=3, label=ylabel)
+        for y, style, color, label in ref_lines:
+            self.ax.axhline(y=y, linestyle=style, color=color, label=label)
+        self.ax.set_ylabel(ylabel)
+        self.ax.grid(which="major", linestyle=":", alpha=0.5)
+        self.ax.xaxis_date()
+        self.ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(self.ax.xaxis.get_major_locator()))
+        if len(ref_lines) or len(self.x):
+            self.ax.legend(loc="best", frameon=False, fontsize=8)
+
+        self.cursor = self.ax.axvline(np.nan, color="grey", linewidth=0.8, animated=True)
+        self.cursor_text = self.ax.text(0.01, 0.98, "", transform=self.ax.transAxes,
+                                        va="top", fontsize=8, animated=True)
+
+        if len(self.x):
+            pad = max((self.x[-1] - self.x[0]) * 0.02, 1.0)
+            self._updating = True
+            self.ax.set_xlim(self.x[0] - pad, self.x[-1] + pad)
+            self._updating = False
+            self._redecimate()
+            self.ax.relim()
+            self.ax.autoscale_view(scalex=False)
+        if self._xlim_cid is not None:
+            self.ax.callbacks.disconnect(self._xlim_cid)
+        self._xlim_cid = self.ax.callbacks.connect("xlim_changed", self._on_xlim_changed)
+        self.toolbar.update()  # la vue de départ devient celle du bouton « Accueil »
+        self.canvas.draw_idle()
+
+    def _redecimate(self):
+        if self.line is None or not len(self.x):
+            return
+        x0, x1 = self.ax.get_xlim()
+        lo = max(np.searchsorted(self.x, x0) - 1, 0)
+        hi = min(np.searchsorted(self.x, x1) + 1, len(self.x))
+        keep = lo + minmax_decimate(self.x[lo:hi], self.y[lo:hi], DECIMATION_BINS)
+        self.line.set_data(self.x[keep], self.y[keep])
+        self.line.set_marker("o" if len(keep) <= MARKER_MAX_POINTS else "None")
+
+    def _on_xlim_changed(self, ax):
+        if self._updating:
+            return
+        self._redecimate()
+        self.canvas.draw_idle()
+
+    def _on_draw(self, event):
+        # Fond sans le curseur, réutilisé à chaque mouvement de souris
+        self._background = self.canvas.copy_from_bbox(self.ax.bbox)
+        if self.cursor is not None:
+            self.ax.draw_artist(self.cursor)
+            self.ax.draw_artist(self.cursor_text)
+
+    def _on_motion(self, event):
+        if self._background is None or self.cursor is None or not len(self.x):
+            return
+        if event.inaxes is not self.ax or self.toolbar.mode:
+            return
+        i = int(np.clip(np.searchsorted(self.x, event.xdata), 0, len(self.x) - 1))
+        if i > 0 and abs(self.x[i - 1] - event.xdata) < abs(self.x[i] - event.xdata):
+            i -= 1
+        self.cursor.set_xdata([self.x[i], self.x[i]])
+        self.cursor_text.set_text(f"{mdates.num2date(self.x[i]):%d/%m/%Y %H:%M}  {self.y[i]:.2f}")
+        self.canvas.restore_region(self._background)
+        self.ax.draw_artist(self.cursor)
+        self.ax.draw_artist(self.cursor_text)
+        self.canvas.blit(self.ax.bbox)
@@ -0,0 +1,172 @@
+# gui/contact_sheet_tab.py
+
+import os
+from collections import OrderedDict
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QListView, QMessageBox
+)
+from PyQt5.QtCore import (
+    Qt, QSize, QObject, QRunnable, QThreadPool, QAbstractListModel, QModelIndex, pyqtSignal
+)
+from PyQt5.QtGui import QPixmap, QIcon, QImage, QColor
+from functions.excel_utils import list_station_photos
+from functions.thumbnail_cache import load_thumbnail, prune_thumbnail_cache, THUMB_SIZE
+
+MEMORY_CACHE_SIZE = 2000  # vignettes gardées en mémoire (LRU)
+
+
+class _ThumbnailSignals(QObject):
+    done = pyqtSignal(int, int, QImage)  # génération, ligne, vignette
+
+
+class _ThumbnailTask(QRunnable):
+    def __init__(self, generation, row, path, signals):
+        super().__init__()
+        self.generation = generation
+        self.row = row
+        self.path = path
+        self.signals = signals
+
+    def run(self):
+        self.signals.done.emit(self.generation, self.row, load_thumbnail(self.path))
+
+
+class _PruneCacheTask(QRunnable):
+    def run(self):
+        try:
+            prune_thumbnail_cache()
+        except OSError as e:
+            print(f"Élagage du cache de vignettes impossible : {e}")
+
+
+class ThumbnailModel(QAbstractListModel):
+    """
+    Modèle des photos d'une station. La vue ne demande l'icône (DecorationRole) que
+    pour les cellules visibles : c'est à ce moment seulement que la vignette est
+    demandée au pool de threads, puis la cellule est rafraîchie à réception.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.folder = None
+        self.photos = []
+        self.generation = 0
+        self.pending = set()
+        self.pixmaps = OrderedDict()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max(2, QThreadPool.globalInstance().maxThreadCount() - 1))
+        self.signals = _ThumbnailSignals()
+        self.signals.done.connect(self._on_thumbnail)
+        placeholder = QPixmap(THUMB_SIZE, THUMB_SIZE)
+        placeholder.fill(QColor("lightgrey"))
+        self.placeholder = QIcon(placeholder)
+
+    def set_folder(self, folder):
+        photos = list_station_photos(folder) if folder and os.path.isdir(folder) else []
+        self.beginResetModel()
+        self.generation += 1  # les vignettes encore en cours de l'ancien dossier sont ignorées
+        self.pool.clear()
+        self.pending.clear()
+        self.folder = folder
+        self.photos = photos
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.photos)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        photo = self.photos[index.row()]
+        if role == Qt.DisplayRole:
+            return photo
+        if role == Qt.ToolTipRole:
+            return os.path.join(self.folder, photo)
+        if role == Qt.DecorationRole:
+            path = os.path.join(self.folder, photo)
+            if path in self.pixmaps:
+                self.pixmaps.move_to_end(path)
+                return self.pixmaps[path]
+            if index.row() not in self.pending:
+                self.pending.add(index.row())
+                self.pool.start(_ThumbnailTask(self.generation, index.row(), path, self.signals))
+            return self.placeholder
+        return None
+
+    def _on_thumbnail(self, generation, row, image):
+        if generation != self.generation:
+            return
+        self.pending.discard(row)
+        if image.isNull():
+            return
+        path = os.path.join(self.folder, self.photos[row])
+        self.pixmaps[path] = QIcon(QPixmap.fromImage(image))
+        while len(self.pixmaps) > MEMORY_CACHE_SIZE:
+            self.pixmaps.popitem(last=False)
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+
+class ContactSheetTab(QWidget):
+    """
+    Planche contact d'une station : grille de vignettes construite sur l'arborescence
+    du dossier d'entrée (un sous-dossier par station). Un double-clic (ou Entrée) ouvre
+    la photo dans l'onglet Mesure.
+    """
+    photo_activated = pyqtSignal(str, str)  # station, photo
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.input_folder = None
+
+        layout = QVBoxLayout(self)
+        top = QHBoxLayout()
+        layout.addLayout(top)
+        top.addWidget(QLabel("Station :"))
+        self.station_combo = QComboBox()
+        self.station_combo.currentTextChanged.connect(self.show_station)
+        top.addWidget(self.station_combo)
+        top.addStretch()
+        self.count_label = QLabel("0 photo(s)")
+        top.addWidget(self.count_label)
+
+        self.model = ThumbnailModel(self)
+        self.view = QListView()
+        self.view.setViewMode(QListView.IconMode)
+        self.view.setResizeMode(QListView.Adjust)
+        self.view.setMovement(QListView.Static)
+        self.view.setUniformItemSizes(True)
+        self.view.setLayoutMode(QListView.Batched)
+        self.view.setIconSize(QSize(THUMB_SIZE, THUMB_SIZE))
+        self.view.setGridSize(QSize(THUMB_SIZE + 20, THUMB_SIZE + 40))
+        self.view.setModel(self.model)
+        self.view.activated.connect(self._on_activated)
+        layout.addWidget(self.view)
+
+        # Vignettes orphelines ou trop anciennes : élagage en arrière-plan à l'ouverture
+        QThreadPool.globalInstance().start(_PruneCacheTask())
+
+    def set_input_folder(self, input_folder):
+        self.input_folder = input_folder
+        self.station_combo.blockSignals(True)
+        self.station_combo.clear()
+        if input_folder and os.path.isdir(input_folder):
+            self.station_combo.addItems(sorted(
+                d for d in os.listdir(input_folder)
+                if os.path.isdir(os.path.join(input_folder, d))
+            ))
+        self.station_combo.blockSignals(False)
+        self.show_station(self.station_combo.currentText())
+
+    def show_station(self, station):
+        folder = os.path.join(self.input_folder, station) if self.input_folder and station else None
+        try:
+            self.model.set_folder(folder)
+        except OSError as e:
+            QMessageBox.warning(self, "Erreur", f"Dossier illisible : {e}")
+            return
+        self.count_label.setText(f"{self.model.rowCount()} photo(s)")
+
+    def _on_activated(self, index):
+        if index.isValid():
+            self.photo_activated.emit(self.station_combo.currentText(), self.model.photos[index.row()])
@@ -0,0 +1,156 @@
+# gui/dataset_model.py
+
+import pandas as pd
+from PyQt5.QtCore import QObject, pyqtSignal
+from functions.excel_utils import update_excel_result, append_photos_to_excel
+from functions.work_queue import workbook_lock_for
+from functions.result_utilis import (
+    load_all_station_data, load_ram_info, build_measurement_table,
+    write_parquet_partitions, parquet_dir_for
+)
+
+
+class StationDataset(QObject):
+    """
+    Modèle partagé du classeur de résultats, chargé une fois (toutes les feuilles
+    en une lecture) et interrogé par les onglets Mesure et Résultats.
+    Les écritures passent par ce modèle : le classeur est mis à jour, la copie en
+    mémoire est modifiée sur place et seule la station concernée est signalée.
+    """
+    reloaded = pyqtSignal()
+    station_changed = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.excel_file = None
+        self.summary = pd.DataFrame(columns=["Station", "Z_CC49"])
+        self.frames = {}
+        self.ram_info = {}
+        self._tables = {}           # station -> table longue (cache)
+        self._parquet_dirty = set()  # stations à réexporter au prochain lot
+        self.station_changed.connect(self._invalidate)
+
+    # --- Chargement -------------------------------------------------------
+
+    def load(self, excel_file):
+        # Lecture d'abord : en cas d'échec, le modèle garde le classeur précédent
+        summary, frames = load_all_station_data(excel_file)
+        ram_info = load_ram_info()
+        self.excel_file = excel_file
+        self.summary, self.frames, self.ram_info = summary, frames, ram_info
+        self._tables.clear()
+        # Toutes les stations sont à (ré)exporter : flush_parquet n'écrit que les partitions modifiées
+        self._parquet_dirty = set(frames)
+        self.reloaded.emit()
+
+    def reload_stations(self, stations):
+        """Relit uniquement les feuilles indiquées (ex. résultats fusionnés par d'autres opérateurs)."""
+        stations = [s for s in stations if s]
+        if not self.excel_file or not stations:
+            return
+        summary, frames = load_all_station_data(self.excel_file, stations)
+        self.summary = summary
+        for station, df in frames.items():
+            self.frames[station] = df
+            self.station_changed.emit(station)
+
+    def is_loaded(self):
+        return self.excel_file is not None
+
+    # --- Lecture ----------------------------------------------------------
+
+    def stations(self):
+        return list(self.frames)
+
+    def station_frame(self, station):
+        return self.frames.get(station)
+
+    def missing_photos(self):
+        """Photos sans résultat : [(feuille, index_ligne, photo)]."""
+        missing = []
+        for sheet, df in self.frames.items():
+            if "Nom de la photo" not in df.columns or "Statut" not in df.columns:
+                continue
+            todo = df.index[df["Statut"] == "à mesurer"]
+            missing.extend((sheet, int(idx), df.at[idx, "Nom de la photo"]) for idx in todo)
+        return missing
+
+    def date_range(self):
+        """Première et dernière date de prise de vue du classeur, ou (None, None)."""
+        bounds = [
+            (df["Date / Heure"].min(), df["Date / Heure"].max())
+            for df in self.frames.values()
+            if "Date / Heure" in df.columns and df["Date / Heure"].notna().any()
+        ]
+        if not bounds:
+            return None, None
+        return min(b[0] for b in bounds), max(b[1] for b in bounds)
+
+    def find_row(self, station, photo):
+        df = self.frames.get(station)
+        if df is None or "Nom de la photo" not in df.columns:
+            return None
+        match = df.index[df["Nom de la photo"] == photo]
+        return int(match[0]) if len(match) else None
+
+    def station_table(self, station):
+        """Table longue (format Parquet) d'une station, recalculée seulement si la station a changé."""
+        if station not in self._tables:
+            df = self.frames.get(station)
+            frames = {station: df} if df is not None else {}
+            self._tables[station] = build_measurement_table(self.summary, frames, self.ram_info)
+        return self._tables[station]
+
+    def measurement_table(self):
+        tables = [self.station_table(s) for s in self.frames]
+        tables = [t for t in tables if not t.empty]
+        if not tables:
+            return build_measurement_table(self.summary, {}, self.ram_info)
+        return pd.concat(tables, ignore_index=True)
+
+    # --- Écriture ---------------------------------------------------------
+
+    def set_result(self, station, row, value, write=True):
+        """
+        Enregistre un résultat. write=False met seulement à jour la copie en mémoire
+        (le classeur a déjà été écrit, par exemple par la fusion de la file partagée).
+        """
+        if write:
+            update_excel_result(self.excel_file, station, row, value, lock=workbook_lock_for(self.excel_file))
+        df = self.frames.get(station)
+        if df is not None and row in df.index:
+            numeric = pd.to_numeric(pd.Series([value]), errors="coerce").iloc[0]
+            df.at[row, "Résultat"] = numeric
+            if pd.notna(numeric):
+                df.at[row, "Statut"] = "mesuré"
+            elif str(value).strip().upper() == "INEXPLOITABLE":
+                df.at[row, "Statut"] = "inexploitable"
+            else:
+                df.at[row, "Statut"] = "à mesurer"
+        self.station_changed.emit(station)
+
+    def append_photos(self, new_photos):
+        """Ajoute de nouvelles photos au classeur et au modèle. Retourne [(feuille, index_ligne, photo)]."""
+        added = append_photos_to_excel(self.excel_file, new_photos, lock=workbook_lock_for(self.excel_file))
+        # Même si un autre opérateur a déjà ajouté ces photos, les feuilles ont changé
+        self.reload_stations(sorted(new_photos))
+        return added
+
+    # --- Caches -----------------------------------------------------------
+
+    def _invalidate(self, station):
+        self._tables.pop(station, None)
+        self._parquet_dirty.add(station)
+
+    def flush_parquet(self):
+        """Réexporte vers le jeu Parquet les seules stations modifiées depuis le dernier lot."""
+        if not self.excel_file or not self._parquet_dirty:
+            return []
+        tables = [self.station_table(s) for s in sorted(self._parquet_dirty) if s in self.frames]
+        tables = [t for t in tables if not t.empty]
+        written = []
+        if tables:
+            written = write_parquet_partitions(pd.concat(tables, ignore_index=True),
+                                               parquet_dir_for(self.excel_file))
+        self._parquet_dirty.clear()
+        return written
@@ -2,11 +2,43 @@
 
 import os
 import sqlite3
+import pandas as pd
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QPushButton,
-    QFileDialog, QMessageBox, QGroupBox, QFormLayout
+    QFileDialog, QMessageBox, QGroupBox, QFormLayout,
+    QLineEdit, QDoubleSpinBox
 )
-from functions.excel_utils import create_or_update_excel
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from functions.excel_utils import create_or_update_excel, RESULTS_WORKBOOK_NAME
+from functions.meteo_utils import ingest_meteo_csv, ingest_wave_csv
+from functions.work_queue import workbook_lock_for
+
+ENV_WINDOW_MARGIN = pd.Timedelta(days=30)  # marge autour de la période des photos
+
+
+class _IngestSignals(QObject):
+    finished = pyqtSignal(str, str)  # libellé, chemin du cache
+    failed = pyqtSignal(str, str)    # libellé, message
+
+
+class _IngestTask(QRunnable):
+    """Import d'un CSV météo / vagues hors du thread de l'interface (fichiers de plusieurs centaines de Mo)."""
+
+    def __init__(self, label, func, args, kwargs, signals):
+        super().__init__()
+        self.label = label
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = signals
+
+    def run(self):
+        try:
+            cache = self.func(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.failed.emit(self.label, str(e))
+            return
+        self.signals.finished.emit(self.label, cache)
 
 
 class ExcelTab(QWidget):
@@ -20,6 +52,10 @@ class ExcelTab(QWidget):
         self.input_folder = None
         self.output_folder = None
         self.excel_file = None
+        self.dataset = None
+        self.ingest_signals = _IngestSignals()
+        self.ingest_signals.finished.connect(self._on_ingest_finished)
+        self.ingest_signals.failed.connect(self._on_ingest_failed)
 
         # Préparation de la base SQLite de settings
         base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
@@ -54,12 +90,52 @@ class ExcelTab(QWidget):
         self.btn_generate.clicked.connect(self.generate_excel)
         main_layout.addWidget(self.btn_generate)
 
+        # Import des données météo (Météo-France) et vagues (CANDHIS)
+        env_group = QGroupBox("Données météo / vagues")
+        env_layout = QFormLayout()
+        env_group.setLayout(env_layout)
+
+        self.btn_import_meteo = QPushButton("Importer CSV météo")
+        self.btn_import_meteo.clicked.connect(self.import_meteo)
+        env_layout.addRow(self.btn_import_meteo)
+
+        self.buoy_id_edit = QLineEdit()
+        env_layout.addRow("Bouée CANDHIS (n°) :", self.buoy_id_edit)
+        self.buoy_lat_spin = QDoubleSpinBox()
+        self.buoy_lat_spin.setRange(-90.0, 90.0)
+        self.buoy_lat_spin.setDecimals(5)
+        env_layout.addRow("Latitude bouée :", self.buoy_lat_spin)
+        self.buoy_lon_spin = QDoubleSpinBox()
+        self.buoy_lon_spin.setRange(-180.0, 180.0)
+        self.buoy_lon_spin.setDecimals(5)
+        env_layout.addRow("Longitude bouée :", self.buoy_lon_spin)
+        self.btn_import_waves = QPushButton("Importer CSV vagues")
+        self.btn_import_waves.clicked.connect(self.import_waves)
+        env_layout.addRow(self.btn_import_waves)
+
+        main_layout.addWidget(env_group)
+
         self.status_label = QLabel("")
         main_layout.addWidget(self.status_label)
 
         # Chargement des réglages
         self._load_settings()
 
+    def set_dataset(self, dataset):
+        self.dataset = dataset
+
+    def _environment_window(self):
+        """
+        Fenêtre d'import météo / vagues : période couverte par les photos du classeur
+        chargé, élargie de ENV_WINDOW_MARGIN. (None, None) si aucune date n'est connue.
+        """
+        if self.dataset is None or not self.dataset.is_loaded():
+            return None, None
+        first, last = self.dataset.date_range()
+        if first is None:
+            return None, None
+        return first - ENV_WINDOW_MARGIN, last + ENV_WINDOW_MARGIN
+
     def _init_db(self):
         conn = sqlite3.connect(self.db_path)
         c = conn.cursor()
@@ -119,7 +195,8 @@ class ExcelTab(QWidget):
             QMessageBox.warning(self, "Attention", "Veuillez sélectionner le dossier de sortie.")
             return
         try:
-            excel_file, msg = create_or_update_excel(self.input_folder, self.output_folder)
+            lock = workbook_lock_for(os.path.join(self.output_folder, RESULTS_WORKBOOK_NAME))
+            excel_file, msg = create_or_update_excel(self.input_folder, self.output_folder, lock=lock)
             self.excel_file = excel_file
             self.status_label.setText(msg)
             QMessageBox.information(self, "Succès", f"{msg}\nExcel généré : {excel_file}")
@@ -128,3 +205,43 @@ class ExcelTab(QWidget):
                 main_window.update_excel_file_and_folder(excel_file, self.input_folder)
         except Exception as e:
             QMessageBox.critical(self, "Erreur", f"Erreur lors de la génération de l'Excel :\n{e}")
+
+    def _start_ingest(self, label, func, *args, **kwargs):
+        self.btn_import_meteo.setEnabled(False)
+        self.btn_import_waves.setEnabled(False)
+        self.status_label.setText(f"Import {label} en cours...")
+        QThreadPool.globalInstance().start(_IngestTask(label, func, args, kwargs, self.ingest_signals))
+
+    def _on_ingest_finished(self, label, cache):
+        self.btn_import_meteo.setEnabled(True)
+        self.btn_import_waves.setEnabled(True)
+        self.status_label.setText(f"Import {label} terminé : {cache}")
+
+    def _on_ingest_failed(self, label, message):
+        self.btn_import_meteo.setEnabled(True)
+        self.btn_import_waves.setEnabled(True)
+        self.status_label.setText("")
+        QMessageBox.critical(self, "Erreur", f"Import {label} impossible :\n{message}")
+
+    def import_meteo(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Sélectionner l'export météo", "", "CSV (*.csv *.csv.gz)")
+        if not path:
+            return
+        date_min, date_max = self._environment_window()
+        self._start_ingest("météo", ingest_meteo_csv, path, date_min=date_min, date_max=date_max)
+
+    def import_waves(self):
+        buoy_id = self.buoy_id_edit.text().strip()
+        if not buoy_id:
+            QMessageBox.warning(self, "Attention", "Veuillez renseigner le numéro de la bouée.")
+            return
+        lat, lon = self.buoy_lat_spin.value(), self.buoy_lon_spin.value()
+        if lat == 0 and lon == 0:
+            QMessageBox.warning(self, "Attention", "Veuillez renseigner la position de la bouée.")
+            return
+        path, _ = QFileDialog.getOpenFileName(self, "Sélectionner l'export CANDHIS", "", "CSV (*.csv *.csv.gz)")
+        if not path:
+            return
+        date_min, date_max = self._environment_window()
+        self._start_ingest("vagues", ingest_wave_csv, path, buoy_id, lat, lon,
+                           date_min=date_min, date_max=date_max)
@@ -0,0 +1,121 @@
+# gui/folder_watcher.py
+
+import os
+from PyQt5.QtCore import QObject, QTimer, QFileSystemWatcher, pyqtSignal
+from functions.excel_utils import list_station_photos
+
+
+class FolderWatcher(QObject):
+    """
+    Surveille le dossier d'entrée (un sous-dossier par station) et signale les
+    nouvelles photos, groupées par station, sans rescanner toute l'arborescence.
+
+    Deux modes :
+      - notifications système (inotify via QFileSystemWatcher) ;
+      - scrutation périodique, pour les lecteurs réseau où les notifications
+        ne remontent pas : seuls les dossiers dont la date de modification a
+        changé sont relistés.
+    Dans les deux cas, une rafale de dépôts est regroupée (anti-rebond) avant émission.
+    """
+    new_photos = pyqtSignal(dict)  # { station: [photos] }
+
+    def __init__(self, input_folder, polling=False, debounce_ms=2000, poll_ms=30000, parent=None):
+        super().__init__(parent)
+        self.input_folder = input_folder
+        self.polling = polling
+        self.known = {}       # station -> set(photos)
+        self.dir_mtimes = {}  # dossier -> mtime au dernier listage
+        self.dirty = set()    # dossiers à relister au prochain déclenchement
+
+        self.debounce = QTimer(self)
+        self.debounce.setSingleShot(True)
+        self.debounce.setInterval(debounce_ms)
+        self.debounce.timeout.connect(self._flush)
+
+        self.watcher = None
+        self.poll_timer = None
+        if polling:
+            self.poll_timer = QTimer(self)
+            self.poll_timer.setInterval(poll_ms)
+            self.poll_timer.timeout.connect(self._poll)
+        else:
+            self.watcher = QFileSystemWatcher(self)
+            self.watcher.directoryChanged.connect(self._on_directory_changed)
+
+    def start(self):
+        """État initial : les photos déjà présentes ne sont pas signalées."""
+        self.known.clear()
+        self.dir_mtimes.clear()
+        for station in self._station_dirs():
+            path = os.path.join(self.input_folder, station)
+            self.known[station] = set(list_station_photos(path))
+            self.dir_mtimes[path] = self._mtime(path)
+        self.dir_mtimes[self.input_folder] = self._mtime(self.input_folder)
+        if self.watcher is not None:
+            self.watcher.addPath(self.input_folder)
+            self.watcher.addPaths([os.path.join(self.input_folder, s) for s in self.known])
+        else:
+            self.poll_timer.start()
+
+    def stop(self):
+        self.debounce.stop()
+        if self.poll_timer is not None:
+            self.poll_timer.stop()
+        if self.watcher is not None and self.watcher.directories():
+            self.watcher.removePaths(self.watcher.directories())
+
+    def _station_dirs(self):
+        return [
+            d for d in os.listdir(self.input_folder)
+            if os.path.isdir(os.path.join(self.input_folder, d))
+        ]
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _on_directory_changed(self, path):
+        self.dirty.add(os.path.normpath(path))
+        self.debounce.start()  # redémarre : on attend la fin de la rafale
+
+    def _poll(self):
+        for path in [self.input_folder] + [os.path.join(self.input_folder, s) for s in self.known]:
+            mtime = self._mtime(path)
+            if mtime != self.dir_mtimes.get(path):
+                self.dir_mtimes[path] = mtime
+                self.dirty.add(os.path.normpath(path))
+        if self.dirty:
+            self.debounce.start()
+
+    def _flush(self):
+        dirty, self.dirty = self.dirty, set()
+        root = os.path.normpath(self.input_folder)
+        stations = set()
+        if root in dirty:
+            # Nouveau dossier station éventuel
+            for station in self._station_dirs():
+                if station not in self.known:
+                    self.known[station] = set()
+                    path = os.path.join(self.input_folder, station)
+                    self.dir_mtimes[path] = self._mtime(path)
+                    if self.watcher is not None:
+                        self.watcher.addPath(path)
+                    stations.add(station)
+            dirty.discard(root)
+        stations.update(os.path.basename(path) for path in dirty)
+
+        found = {}
+        for station in stations:
+            path = os.path.join(self.input_folder, station)
+            if not os.path.isdir(path):
+                continue
+            current = set(list_station_photos(path))
+            added = sorted(current - self.known.get(station, set()))
+            self.known[station] = current
+            if added:
+                found[station] = added
+        if found:
+            self.new_photos.emit(found)
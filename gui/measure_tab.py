@@ -1,14 +1,20 @@
 import os
+import getpass
 import pandas as pd
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QMessageBox,
     QGraphicsView, QGraphicsScene, QGraphicsRectItem,
-    QDoubleSpinBox, QFileDialog, QLabel
+    QDoubleSpinBox, QFileDialog, QLabel, QCheckBox, QLineEdit
 )
-from PyQt5.QtCore import Qt, QRectF, QUrl
+from PyQt5.QtCore import Qt, QRectF, QUrl, QTimer
 from PyQt5.QtGui import QPen, QPixmap, QTransform, QDesktopServices
-from functions.excel_utils import update_excel_result
 from functions.measure_utils import calculate_height
+from functions.work_queue import WorkQueue, queue_path_for
+from functions.quality_utils import OutlierMonitor
+from functions.evidence_utils import save_selection, selections_path_for
+from gui.folder_watcher import FolderWatcher
+
+MERGE_INTERVAL_MS = 2 * 60 * 1000  # fusion périodique des résultats de la file dans l'Excel
 
 
 class ImageViewer(QGraphicsView):
@@ -19,6 +25,7 @@ class ImageViewer(QGraphicsView):
         self.pixmap_item = None
         self.current_rect_item = None
         self.selections = []
+        self.rotation = 0
         self.setTransformationAnchor(QGraphicsView.AnchorUnderMouse)
         self.setResizeAnchor(QGraphicsView.AnchorUnderMouse)
         self.setDragMode(QGraphicsView.NoDrag)
@@ -35,6 +42,7 @@ class ImageViewer(QGraphicsView):
         self.setSceneRect(QRectF(pixmap.rect()))
         self.fitInView(self.pixmap_item, Qt.KeepAspectRatio)
         self.selections = []
+        self.rotation = 0
         return True
 
     def wheelEvent(self, event):
@@ -92,8 +100,17 @@ class ImageViewer(QGraphicsView):
             transform = QTransform().rotate(angle)
             new_pixmap = self.pixmap_item.pixmap().transformed(transform, Qt.SmoothTransformation)
             self.pixmap_item.setPixmap(new_pixmap)
+            self.rotation = (self.rotation + angle) % 360
             self.clearSelections()
 
+    def normalizedSelections(self):
+        """Rectangles (x, y, l, h) en fractions de l'image affichée, indépendants de sa taille."""
+        if not self.pixmap_item:
+            return []
+        w = self.pixmap_item.pixmap().width()
+        h = self.pixmap_item.pixmap().height()
+        return [(r.x() / w, r.y() / h, r.width() / w, r.height() / h) for r in self.selections]
+
 
 class MeasureTab(QWidget):
     def __init__(self, parent=None):
@@ -105,6 +122,13 @@ class MeasureTab(QWidget):
         self.current_photo = None
         self.current_photo_path = None
         self.calculated_value = None
+        self.work_queue = None
+        self.folder_watcher = None
+        self.dataset = None
+        self.outlier_monitor = OutlierMonitor()
+        self.merge_timer = QTimer(self)
+        self.merge_timer.setInterval(MERGE_INTERVAL_MS)
+        self.merge_timer.timeout.connect(self.merge_queue)
 
         layout = QVBoxLayout(self)
         self.setLayout(layout)
@@ -126,6 +150,23 @@ class MeasureTab(QWidget):
         self.photo_info_label = QLabel("Photo: - (Site: -)")
         top_info.addWidget(self.photo_info_label)
 
+        # Mode multi-opérateur (file de travail partagée)
+        queue_layout = QHBoxLayout()
+        layout.addLayout(queue_layout)
+        self.cb_shared_queue = QCheckBox("Mode multi-opérateur")
+        self.cb_shared_queue.toggled.connect(self.toggle_shared_queue)
+        queue_layout.addWidget(self.cb_shared_queue)
+        queue_layout.addWidget(QLabel("Opérateur :"))
+        self.operator_edit = QLineEdit(getpass.getuser())
+        queue_layout.addWidget(self.operator_edit)
+        queue_layout.addStretch()
+        self.cb_watch = QCheckBox("Surveiller le dossier")
+        self.cb_watch.toggled.connect(self.toggle_folder_watch)
+        queue_layout.addWidget(self.cb_watch)
+        self.cb_watch_polling = QCheckBox("Scrutation (lecteur réseau)")
+        self.cb_watch_polling.toggled.connect(lambda _: self.toggle_folder_watch(self.cb_watch.isChecked()))
+        queue_layout.addWidget(self.cb_watch_polling)
+
         # Photo controls
         btn_layout = QHBoxLayout()
         layout.addLayout(btn_layout)
@@ -178,76 +219,236 @@ class MeasureTab(QWidget):
         self.instruction_label = QLabel("Mode : tracez la règle (rouge)")
         layout.addWidget(self.instruction_label)
 
+    def set_dataset(self, dataset):
+        self.dataset = dataset
+        dataset.reloaded.connect(self._rebuild_outlier_monitor)
+
+    def _rebuild_outlier_monitor(self):
+        try:
+            self.outlier_monitor = OutlierMonitor.from_table(self.dataset.measurement_table())
+        except Exception as e:
+            print(f"Contrôle des valeurs indisponible : {e}")
+            self.outlier_monitor = OutlierMonitor()
+
     def set_excel_file_and_folder(self, excel_file, input_folder):
+        # La file de l'ancien classeur est fusionnée et libérée avant de changer de classeur
+        if self.work_queue:
+            self.toggle_shared_queue(False)
         self.excel_file = excel_file
         self.input_folder = input_folder
+        if self.cb_shared_queue.isChecked():
+            self.toggle_shared_queue(True)
+        if self.cb_watch.isChecked():
+            self.toggle_folder_watch(True)
 
-    def list_missing(self):
-        if not self.excel_file:
-            QMessageBox.warning(self, "Attention", "Aucun fichier Excel chargé.")
+    def operator(self):
+        return self.operator_edit.text().strip() or getpass.getuser()
+
+    def toggle_shared_queue(self, enabled):
+        self.merge_timer.stop()
+        if self.work_queue:
+            self.merge_queue()
+            pending = self.missing_photos + ([self.current_photo] if self.current_photo else [])
+            self.work_queue.release(self.operator(), pending)
+            self.work_queue = None
+        self.missing_photos = []
+        self.remaining_label.setText("0")
+        if enabled and self.excel_file:
+            try:
+                self.work_queue = WorkQueue(queue_path_for(self.excel_file))
+                self.merge_timer.start()
+            except Exception as e:
+                QMessageBox.warning(self, "Erreur", f"File partagée indisponible : {e}")
+                self.cb_shared_queue.setChecked(False)
+
+    def toggle_folder_watch(self, enabled):
+        if self.folder_watcher:
+            self.folder_watcher.stop()
+            self.folder_watcher.deleteLater()
+            self.folder_watcher = None
+        if not enabled or not self.input_folder or not self.excel_file:
+            return
+        try:
+            self.folder_watcher = FolderWatcher(
+                self.input_folder, polling=self.cb_watch_polling.isChecked(), parent=self
+            )
+            self.folder_watcher.new_photos.connect(self.on_new_photos)
+            self.folder_watcher.start()
+        except OSError as e:
+            self.folder_watcher = None
+            QMessageBox.warning(self, "Erreur", f"Surveillance impossible : {e}")
+
+    def on_new_photos(self, new_photos):
+        """Ajoute les photos arrivées dans le dossier à l'Excel et à la liste à mesurer."""
+        try:
+            added = self.dataset.append_photos(new_photos)
+        except Exception as e:
+            print(f"Ajout des nouvelles photos impossible : {e}")
             return
+        if not added:
+            return
+        if self.work_queue:
+            self.work_queue.add_photos(added)
+            self._lease_more()
+        else:
+            self.missing_photos.extend(added)
+            self.remaining_label.setText(str(len(self.missing_photos)))
+        self.instruction_label.setText(f"{len(added)} nouvelle(s) photo(s) ajoutée(s).")
+
+    def _lease_more(self):
+        leased = self.work_queue.lease(self.operator())
+        known = set(self.missing_photos)
+        self.missing_photos.extend(p for p in leased if p not in known and p != self.current_photo)
+        self.remaining_label.setText(str(len(self.missing_photos)))
+
+    def _claim(self, sheet, row, photo):
+        """En mode multi-opérateur, prend le bail de la photo avant de l'afficher."""
+        if not self.work_queue:
+            return True
+        df = self.dataset.station_frame(sheet)
+        measured = (df is not None and row in df.index and "Statut" in df.columns
+                    and df.at[row, "Statut"] != "à mesurer")
+        try:
+            return self.work_queue.claim(self.operator(), sheet, row, photo, measured)
+        except Exception as e:
+            QMessageBox.warning(self, "Erreur", f"File partagée indisponible : {e}")
+            return False
+
+    def _next_claimable(self):
+        """Retire de la liste la prochaine photo dont on obtient le bail (les autres ont été reprises)."""
+        while self.missing_photos:
+            item = self.missing_photos.pop(0)
+            if self._claim(*item):
+                return item
+        return None
+
+    def merge_queue(self):
+        """Fusionne dans l'Excel les résultats en attente dans la file, tous opérateurs confondus."""
+        if not self.work_queue or not self.excel_file:
+            return
+        try:
+            self.work_queue.merge_into_excel(self.excel_file)
+        except Exception as e:
+            # Les résultats restent dans la file : ils seront fusionnés au prochain passage
+            print(f"Fusion dans l'Excel différée : {e}")
+
+    def _record_result(self, sheet, row, photo, value):
+        """Enregistre un résultat. Retourne False s'il n'a pas pu l'être (bail perdu)."""
+        if self.work_queue:
+            try:
+                self.work_queue.submit(sheet, photo, value, self.operator())
+            except Exception as e:
+                QMessageBox.warning(self, "Mesure non enregistrée", str(e))
+                return False
+            # Fusion dans l'Excel au prochain passage du minuteur ou en fin de lot
+            self.dataset.set_result(sheet, row, value, write=False)
+        else:
+            self.dataset.set_result(sheet, row, value)
+        return True
+
+    def flush_parquet_export(self):
+        """Met à jour le jeu Parquet pour les stations mesurées depuis le dernier lot."""
         try:
-            xls = pd.ExcelFile(self.excel_file)
-            missing = []
-            for sheet in xls.sheet_names:
-                if sheet == 'Résumé':
-                    continue
-                df = pd.read_excel(self.excel_file, sheet_name=sheet)
-                if 'Nom de la photo' not in df.columns or 'Résultat' not in df.columns:
-                    continue
-                for idx, val in df['Résultat'].items():
-                    if pd.isna(val) or str(val).strip() == '':
-                        missing.append((sheet, idx+2, df.at[idx, 'Nom de la photo']))
-            self.missing_photos = missing
-            self.remaining_label.setText(str(len(missing)))
-            QMessageBox.information(self, "Info", f"{len(missing)} photo(s) sans résultat.")
+            self.dataset.flush_parquet()
         except Exception as e:
-            QMessageBox.warning(self, "Erreur", f"Impossible de lire l'Excel : {e}")
+            print(f"Export Parquet impossible : {e}")
+
+    def list_missing(self):
+        if not self.excel_file or not self.dataset or not self.dataset.is_loaded():
+            QMessageBox.warning(self, "Attention", "Aucun fichier Excel chargé.")
+            return
+        self.flush_parquet_export()
+        if self.work_queue:
+            self.merge_queue()
+            try:
+                total = self.work_queue.sync_from_excel(self.excel_file)
+                # D'autres opérateurs ont pu fusionner des résultats : on rafraîchit le modèle
+                self.dataset.load(self.excel_file)
+                self._lease_more()
+                QMessageBox.information(
+                    self, "Info",
+                    f"{total} photo(s) sans résultat, {len(self.missing_photos)} réservée(s) pour vous."
+                )
+            except Exception as e:
+                QMessageBox.warning(self, "Erreur", f"Impossible de lire la file partagée : {e}")
+            return
+        missing = self.dataset.missing_photos()
+        self.missing_photos = missing
+        self.remaining_label.setText(str(len(missing)))
+        QMessageBox.information(self, "Info", f"{len(missing)} photo(s) sans résultat.")
+
+    def _show_photo(self, sheet, row, photo):
+        """Affiche une photo et réinitialise la saisie. Retourne False si le fichier est absent."""
+        path = os.path.join(self.input_folder, sheet, photo)
+        if not os.path.exists(path):
+            QMessageBox.warning(self, "Erreur", f"Fichier absent : {path}")
+            return False
+        self.current_photo = (sheet, row, photo)
+        self.current_photo_path = path
+        if not self.image_viewer.setImage(path):
+            QMessageBox.warning(self, "Erreur", "Impossible de charger l'image.")
+        self.image_viewer.clearSelections()
+        self.calculated_value = None
+        self.measure_spin.setValue(0)
+        self.instruction_label.setText("Mode : tracez la règle (rouge)")
+        self.photo_info_label.setText(f"Photo: {photo} (Site: {sheet})")
+        self.remaining_label.setText(str(len(self.missing_photos)))
+        return True
 
     def load_next_photo(self):
-        if not self.missing_photos:
+        item = self._next_claimable()
+        if item is None and self.work_queue:
+            # Fin du lot : fusion dans l'Excel puis nouveau lot
+            self.merge_queue()
+            self._lease_more()
+            item = self._next_claimable()
+        if item is None:
+            # Fin du lot : on met à jour l'export Parquet
+            self.flush_parquet_export()
             QMessageBox.information(self, "Info", "Aucune photo à charger.")
             return
         # Push current to history
         if self.current_photo:
             self.history.append(self.current_photo)
-        sheet, row, photo = self.missing_photos.pop(0)
-        self.remaining_label.setText(str(len(self.missing_photos)))
-        path = os.path.join(self.input_folder, sheet, photo)
-        if os.path.exists(path):
-            self.current_photo = (sheet, row, photo)
-            self.current_photo_path = path
-            if not self.image_viewer.setImage(path):
-                QMessageBox.warning(self, "Erreur", "Impossible de charger l'image.")
-            self.image_viewer.clearSelections()
-            self.calculated_value = None
-            self.measure_spin.setValue(0)
-            self.instruction_label.setText("Mode : tracez la règle (rouge)")
-            self.photo_info_label.setText(f"Photo: {photo} (Site: {sheet})")
-        else:
-            QMessageBox.warning(self, "Erreur", f"Fichier absent : {path}")
+        self._show_photo(*item)
 
     def load_prev_photo(self):
         if not self.history:
             QMessageBox.information(self, "Info", "Aucune photo précédente.")
             return
+        sheet, row, photo = self.history[-1]
+        if not self._claim(sheet, row, photo):
+            QMessageBox.warning(self, "Attention", f"{photo} est en cours de mesure par un autre opérateur.")
+            return
+        self.history.pop()
         # Push current back to front of missing
         if self.current_photo:
             self.missing_photos.insert(0, self.current_photo)
-        sheet, row, photo = self.history.pop()
-        path = os.path.join(self.input_folder, sheet, photo)
-        if os.path.exists(path):
-            self.current_photo = (sheet, row, photo)
-            self.current_photo_path = path
-            self.image_viewer.setImage(path)
-            self.image_viewer.clearSelections()
-            self.calculated_value = None
-            self.measure_spin.setValue(0)
-            self.instruction_label.setText("Mode : tracez la règle (rouge)")
-            self.photo_info_label.setText(f"Photo: {photo} (Site: {sheet})")
-            self.remaining_label.setText(str(len(self.missing_photos)))
-        else:
-            QMessageBox.warning(self, "Erreur", f"Fichier absent : {path}")
+        self._show_photo(sheet, row, photo)
+
+    def open_photo(self, sheet, photo):
+        """Ouvre directement une photo (depuis la planche contact) pour la mesurer."""
+        if not self.input_folder or not self.dataset or not self.dataset.is_loaded():
+            QMessageBox.warning(self, "Attention", "Aucun fichier Excel chargé.")
+            return False
+        row = next((r for s, r, p in self.missing_photos if s == sheet and p == photo), None)
+        if row is None:
+            row = self.dataset.find_row(sheet, photo)
+        if row is None:
+            QMessageBox.warning(self, "Attention",
+                                f"{photo} n'est pas dans l'Excel : mettez-le à jour depuis l'onglet Excel.")
+            return False
+        # En mode multi-opérateur, la photo est ajoutée à la file si besoin et son bail
+        # pris : le résultat pourra être soumis puis fusionné, sans mesure concurrente.
+        if not self._claim(sheet, row, photo):
+            QMessageBox.warning(self, "Attention", f"{photo} est en cours de mesure par un autre opérateur.")
+            return False
+        item = (sheet, row, photo)
+        if item in self.missing_photos:
+            self.missing_photos.remove(item)
+        if self.current_photo and self.current_photo != item:
+            self.history.append(self.current_photo)
+        return self._show_photo(sheet, row, photo)
 
     def calculate_current_height(self):
         if len(self.image_viewer.selections) < 2:
@@ -269,17 +470,48 @@ class MeasureTab(QWidget):
             return
         sheet, row, photo = self.current_photo
         to_save = self.measure_spin.value()
-        update_excel_result(self.excel_file, sheet, row, to_save)
+        improbable, score, median = self.outlier_monitor.check(sheet, to_save)
+        if improbable:
+            answer = QMessageBox.question(
+                self, "Valeur improbable",
+                f"{to_save:.2f} cm s'écarte fortement des dernières mesures de {sheet} "
+                f"(médiane {median:.2f} cm, score {score:.1f}).\n"
+                "Règle et piquet inversés ou faute de frappe ?\n\nEnregistrer quand même ?",
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+            )
+            if answer != QMessageBox.Yes:
+                return
+        if not self._record_result(sheet, row, photo, to_save):
+            return
+        self.outlier_monitor.record(sheet, to_save)
+        self._save_selection(sheet, row, photo, to_save)
         QMessageBox.information(self, "Sauvegardé", f"Mesure enregistrée pour {photo}.")
         self.load_next_photo()
 
+    def _save_selection(self, sheet, row, photo, value):
+        """Conserve les rectangles règle / piquet pour l'export des preuves de mesure."""
+        rects = self.image_viewer.normalizedSelections()
+        if len(rects) < 2:
+            return
+        taken_at = None
+        df = self.dataset.station_frame(sheet)
+        if df is not None and row in df.index and "Date / Heure" in df.columns:
+            ts = df.at[row, "Date / Heure"]
+            taken_at = ts.isoformat() if pd.notna(ts) else None
+        try:
+            save_selection(selections_path_for(self.excel_file), sheet, photo, taken_at,
+                           self.image_viewer.rotation, rects[0], rects[1], value, self.operator())
+        except Exception as e:
+            print(f"Enregistrement des sélections impossible : {e}")
+
     def mark_unusable(self):
         if not self.current_photo:
             QMessageBox.warning(self, "Attention", "Aucune photo chargée.")
             return
         sheet, row, photo = self.current_photo
         # Marquer comme inexploitable (ex: texte spécifique)
-        update_excel_result(self.excel_file, sheet, row, "INEXPLOITABLE")
+        if not self._record_result(sheet, row, photo, "INEXPLOITABLE"):
+            return
         QMessageBox.information(self, "Info", f"Photo {photo} marquée inexploitable.")
         self.load_next_photo()
 
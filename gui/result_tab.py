@@ -1,4 +1,5 @@
 import os
+import numpy as np
 import pandas as pd
 import matplotlib
 matplotlib.use('Agg')
@@ -6,19 +7,68 @@ import matplotlib.pyplot as plt
 import matplotlib.image as mpimg
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QPushButton, QComboBox,
-    QFileDialog, QMessageBox, QGroupBox, QCheckBox, QHBoxLayout
+    QFileDialog, QMessageBox, QGroupBox, QCheckBox, QHBoxLayout, QDateEdit
 )
+from PyQt5.QtCore import QDate, QObject, QRunnable, QThreadPool, pyqtSignal
 
-from functions.result_utilis import (
-    load_summary, load_station_data, load_ram_info
-)
+from functions.result_utilis import station_reference
+from functions.station_index import StationIndex, station_overview
+from functions.analytics_utils import compute_station_trends, write_analysis_sheet
+from functions.quality_utils import flag_outliers, cross_check_neighbours
+from functions.meteo_utils import join_environment, load_environment_series
+from functions.work_queue import workbook_lock_for
+from functions.evidence_utils import load_selections, export_evidence, selections_path_for
+from gui.chart_view import StationChartView
+
+# Superpositions disponibles : (source du cache, colonne, libellé axe secondaire)
+OVERLAYS = {
+    "Vent moyen": ("meteo", "vent_ms", "Vent moyen (m/s)"),
+    "Hauteur des vagues": ("vagues", "vagues_h13_m", "H1/3 (m)"),
+    "Tempêtes": ("meteo", "rafale_ms", None),
+}
+STORM_GUST_MS = 28.0  # rafales >= 100 km/h
+NGF_COLORS = {"PHMA (m)": "C2", "PMVE (m)": "C3", "PMME (m)": "C4", "NM (m)": "C5"}
+
+
+class _EvidenceSignals(QObject):
+    progress = pyqtSignal(int, int)  # fait, total
+    finished = pyqtSignal(list)      # fichiers produits
+    failed = pyqtSignal(str)
+
+
+class _EvidenceExportTask(QRunnable):
+    """Export des preuves hors du thread de l'interface (le pool de processus y est attendu)."""
+
+    def __init__(self, selections, input_folder, out_folder, pdf, signals):
+        super().__init__()
+        self.selections = selections
+        self.input_folder = input_folder
+        self.out_folder = out_folder
+        self.pdf = pdf
+        self.signals = signals
+
+    def run(self):
+        try:
+            produced = export_evidence(self.selections, self.input_folder, self.out_folder,
+                                       pdf=self.pdf, progress=self.signals.progress.emit)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.finished.emit(produced)
 
 
 class ResultTab(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.excel_file = None
+        self.input_folder = None
         self.save_folder = None
+        self.dataset = None
+        self.evidence_out_folder = None
+        self.evidence_signals = _EvidenceSignals()
+        self.evidence_signals.progress.connect(self._on_evidence_progress)
+        self.evidence_signals.finished.connect(self._on_evidence_finished)
+        self.evidence_signals.failed.connect(self._on_evidence_failed)
         self.initUI()
 
     def initUI(self):
@@ -48,17 +98,93 @@ class ResultTab(QWidget):
         for cb in (self.cb_phma_ngf, self.cb_pmve_ngf,
                    self.cb_pmme_ngf, self.cb_nm_ngf, self.cb_avg):
             hbox.addWidget(cb)
+            cb.toggled.connect(lambda _: self.refresh_chart())
         grp_opts.setLayout(hbox)
         layout.addWidget(grp_opts)
 
+        overlay_box = QHBoxLayout()
+        overlay_box.addWidget(QLabel("Superposer :"))
+        self.overlay_combo = QComboBox()
+        self.overlay_combo.addItems(["Aucune"] + list(OVERLAYS))
+        overlay_box.addWidget(self.overlay_combo)
+        layout.addLayout(overlay_box)
+
         self.btn_generate = QPushButton("Générer graphiques")
         self.btn_generate.clicked.connect(self.generate_charts)
         layout.addWidget(self.btn_generate)
+
+        self.btn_analysis = QPushButton("Analyse tendances / érosion (feuille Analyse)")
+        self.btn_analysis.clicked.connect(self.run_analysis)
+        layout.addWidget(self.btn_analysis)
+
+        self.btn_outliers = QPushButton("Détecter les valeurs aberrantes (historique)")
+        self.btn_outliers.clicked.connect(self.detect_outliers)
+        layout.addWidget(self.btn_outliers)
+
+        map_box = QHBoxLayout()
+        self.map_color_combo = QComboBox()
+        self.map_color_combo.addItems(["Dernière hauteur (m)", "Tendance (m/an)"])
+        map_box.addWidget(self.map_color_combo)
+        self.btn_overview = QPushButton("Carte du littoral")
+        self.btn_overview.clicked.connect(self.generate_overview_map)
+        map_box.addWidget(self.btn_overview)
+        layout.addLayout(map_box)
+
+        # Preuves de mesure : photo recadrée avec les rectangles règle / piquet
+        grp_evidence = QGroupBox("Preuves de mesure")
+        evidence_box = QHBoxLayout()
+        evidence_box.addWidget(QLabel("Du"))
+        self.evidence_from = QDateEdit(QDate.currentDate().addYears(-1))
+        self.evidence_from.setCalendarPopup(True)
+        evidence_box.addWidget(self.evidence_from)
+        evidence_box.addWidget(QLabel("au"))
+        self.evidence_to = QDateEdit(QDate.currentDate())
+        self.evidence_to.setCalendarPopup(True)
+        evidence_box.addWidget(self.evidence_to)
+        self.cb_evidence_all = QCheckBox("Toutes les stations")
+        evidence_box.addWidget(self.cb_evidence_all)
+        self.cb_evidence_undated = QCheckBox("Photos non datées")
+        self.cb_evidence_undated.setChecked(True)
+        evidence_box.addWidget(self.cb_evidence_undated)
+        self.cb_evidence_pdf = QCheckBox("PDF par station")
+        evidence_box.addWidget(self.cb_evidence_pdf)
+        self.btn_evidence = QPushButton("Exporter preuves")
+        self.btn_evidence.clicked.connect(self.export_measure_evidence)
+        evidence_box.addWidget(self.btn_evidence)
+        grp_evidence.setLayout(evidence_box)
+        layout.addWidget(grp_evidence)
+
         self.status_label = QLabel("")
         layout.addWidget(self.status_label)
 
-    def set_excel_file(self, excel_file: str):
+        # Graphique interactif de la station sélectionnée
+        station_box = QHBoxLayout()
+        station_box.addWidget(QLabel("Station :"))
+        self.station_combo = QComboBox()
+        self.station_combo.currentTextChanged.connect(lambda _: self.refresh_chart())
+        station_box.addWidget(self.station_combo)
+        station_box.addStretch()
+        layout.addLayout(station_box)
+        self.chart_view = StationChartView()
+        layout.addWidget(self.chart_view, stretch=1)
+
+    def set_dataset(self, dataset):
+        self.dataset = dataset
+        dataset.reloaded.connect(self.refresh_station_list)
+        dataset.station_changed.connect(self._on_station_changed)
+
+    def set_excel_file(self, excel_file: str, input_folder: str = None):
         self.excel_file = excel_file
+        self.input_folder = input_folder
+
+    def _check_loaded(self, need_folder=True):
+        if not self.excel_file or not self.dataset or not self.dataset.is_loaded():
+            QMessageBox.warning(self, "Attention", "Aucun fichier Excel chargé.")
+            return False
+        if need_folder and not self.save_folder:
+            QMessageBox.warning(self, "Attention", "Veuillez sélectionner un dossier de sauvegarde.")
+            return False
+        return True
 
     def select_save_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "Sélectionner le dossier de sauvegarde")
@@ -67,49 +193,17 @@ class ResultTab(QWidget):
             self.save_folder_label.setText(folder)
 
     def generate_charts(self):
-        if not self.excel_file:
-            QMessageBox.warning(self, "Attention", "Aucun fichier Excel chargé.")
-            return
-        if not self.save_folder:
-            QMessageBox.warning(self, "Attention", "Veuillez sélectionner un dossier de sauvegarde.")
+        if not self._check_loaded():
             return
 
-        try:
-            summary = load_summary(self.excel_file)
-            ram_info = load_ram_info()
-            xls = pd.ExcelFile(self.excel_file)
-            sheets = [s for s in xls.sheet_names if s != "Résumé"]
-        except Exception as e:
-            QMessageBox.critical(self, "Erreur lecture", str(e))
-            return
+        sheets = self.dataset.stations()
 
         saved = []
-        colors = {"PHMA (m)": "C2", "PMVE (m)": "C3", "PMME (m)": "C4", "NM (m)": "C5"}
         for site in sheets:
             try:
-                df = load_station_data(self.excel_file, site)
+                df_plot, plot_col, ylabel, z_ref, info = self._station_series(site)
                 code = site.strip().upper()
-
-                info = ram_info.get(code, {})
-                z_ref = info.get("Z_CC49")
                 site_name = site.strip()
-                if z_ref is None:
-                    row = summary[summary["Station"] == code]
-                    if not row.empty:
-                        z_ref = float(row["Z_CC49"].iloc[0])
-
-                if z_ref is not None and "Résultat" in df.columns:
-                    df["Hauteur sable (m)"] = z_ref - df["Résultat"] / 100.0
-                    plot_col = "Hauteur sable (m)"
-                    ylabel = "Hauteur sable (m)"
-                else:
-                    plot_col = "Résultat"
-                    ylabel = "Résultat (cm)"
-
-                if "Date / Heure" in df.columns:
-                    df = df.sort_values("Date / Heure")
-                mask = pd.notna(df.get("Date / Heure")) & pd.notna(df.get(plot_col))
-                df_plot = df.loc[mask]
                 dates = df_plot.get("Date / Heure")
                 y = df_plot.get(plot_col)
 
@@ -123,26 +217,13 @@ class ResultTab(QWidget):
                     dates_str = dates.dt.strftime("%d/%m/%Y")
                     ax.bar(dates_str, y, alpha=0.7, color="C1", zorder=2, label=plot_col)
 
-                # Poteau réf en noir
-                if z_ref is not None:
-                    ax.axhline(y=z_ref, linestyle='--', color="black", label="Poteau")
-
-                # Seuils NGF en couleurs distinctes
-                mapping = {
-                    self.cb_phma_ngf: ("PHMA (m NGF)", "PHMA (m)"),
-                    self.cb_pmve_ngf: ("PMVE (m NGF)", "PMVE (m)"),
-                    self.cb_pmme_ngf: ("PMME (m NGF)", "PMME (m)"),
-                    self.cb_nm_ngf:   ("NM (m NGF)",   "NM (m)")
-                }
-                for cb, (key_ngf, label_simple) in mapping.items():
-                    val = info.get(key_ngf)
-                    if cb.isChecked() and pd.notna(val):
-                        ax.axhline(y=val, linestyle=':', color=colors[label_simple], label=label_simple)
-
-                # Moyenne
-                if self.cb_avg.isChecked() and len(df_plot) > 0:
-                    m = y.mean()
-                    ax.axhline(y=m, linestyle='-.', color="C6", label=f"Moyenne {plot_col}")
+                # Poteau, seuils NGF et moyenne selon les cases cochées
+                for val, style, color, label in self._reference_lines(info, z_ref, y, plot_col):
+                    ax.axhline(y=val, linestyle=style, color=color, label=label)
+
+                # Météo / vagues (graphique linéaire uniquement : l'axe des barres est textuel)
+                if "linéaire" in self.chart_type_combo.currentText().lower() and len(df_plot) > 0:
+                    self._draw_overlay(ax, df_plot, code)
 
                 # Mise en forme et légende avec titre
                 ax.set_xlabel("Date")
@@ -183,3 +264,235 @@ class ResultTab(QWidget):
             )
         else:
             QMessageBox.warning(self, "Erreur", "Aucun graphique n'a pu être généré.")
+
+    def _station_series(self, site):
+        """
+        Série à tracer pour une station : (mesures datées triées, colonne, libellé axe, Z_CC49, infos Ram2022).
+        Hauteur de sable en m NGF si le Z_CC49 du poteau est connu, sinon le résultat brut en cm.
+        """
+        df = self.dataset.station_frame(site).copy()
+        code = site.strip().upper()
+        info = self.dataset.ram_info.get(code, {})
+        z_ref = station_reference(code, self.dataset.ram_info, self.dataset.summary)
+
+        if z_ref is not None and "Résultat" in df.columns:
+            df["Hauteur sable (m)"] = z_ref - df["Résultat"] / 100.0
+            plot_col = "Hauteur sable (m)"
+            ylabel = "Hauteur sable (m)"
+        else:
+            plot_col = "Résultat"
+            ylabel = "Résultat (cm)"
+
+        if "Date / Heure" in df.columns:
+            df = df.sort_values("Date / Heure")
+        mask = pd.notna(df.get("Date / Heure")) & pd.notna(df.get(plot_col))
+        return df.loc[mask], plot_col, ylabel, z_ref, info
+
+    def _reference_lines(self, info, z_ref, y, plot_col):
+        """Lignes horizontales demandées par les cases à cocher : [(y, style, couleur, libellé)]."""
+        lines = []
+        # Poteau réf en noir
+        if z_ref is not None:
+            lines.append((z_ref, "--", "black", "Poteau"))
+
+        # Seuils NGF en couleurs distinctes
+        mapping = {
+            self.cb_phma_ngf: ("PHMA (m NGF)", "PHMA (m)"),
+            self.cb_pmve_ngf: ("PMVE (m NGF)", "PMVE (m)"),
+            self.cb_pmme_ngf: ("PMME (m NGF)", "PMME (m)"),
+            self.cb_nm_ngf:   ("NM (m NGF)",   "NM (m)")
+        }
+        for cb, (key_ngf, label_simple) in mapping.items():
+            val = info.get(key_ngf)
+            if cb.isChecked() and pd.notna(val):
+                lines.append((val, ":", NGF_COLORS[label_simple], label_simple))
+
+        # Moyenne
+        if self.cb_avg.isChecked() and y is not None and len(y) > 0:
+            lines.append((y.mean(), "-.", "C6", f"Moyenne {plot_col}"))
+        return lines
+
+    def refresh_station_list(self):
+        current = self.station_combo.currentText()
+        self.station_combo.blockSignals(True)
+        self.station_combo.clear()
+        if self.dataset is not None:
+            self.station_combo.addItems(self.dataset.stations())
+        if current:
+            self.station_combo.setCurrentText(current)
+        self.station_combo.blockSignals(False)
+        self.refresh_chart()
+
+    def _on_station_changed(self, station):
+        if station == self.station_combo.currentText():
+            self.refresh_chart()
+
+    def refresh_chart(self):
+        """Redessine le graphique intégré de la station sélectionnée."""
+        site = self.station_combo.currentText()
+        if not site or self.dataset is None or self.dataset.station_frame(site) is None:
+            return
+        try:
+            df_plot, plot_col, ylabel, z_ref, info = self._station_series(site)
+        except Exception as e:
+            self.status_label.setText(f"[{site}] Erreur : {e}")
+            return
+        y = df_plot.get(plot_col)
+        self.chart_view.show_series(
+            f"Station {site.strip()}", df_plot["Date / Heure"], y, ylabel,
+            self._reference_lines(info, z_ref, y, plot_col)
+        )
+
+    def run_analysis(self):
+        if not self._check_loaded(need_folder=False):
+            return
+        try:
+            trends = compute_station_trends(self.dataset.measurement_table(), self.dataset.ram_info)
+            if trends.empty:
+                QMessageBox.warning(self, "Erreur", "Aucune mesure exploitable pour l'analyse.")
+                return
+            write_analysis_sheet(self.excel_file, trends, lock=workbook_lock_for(self.excel_file))
+        except Exception as e:
+            QMessageBox.critical(self, "Erreur analyse", str(e))
+            return
+        self.status_label.setText(f"Analyse de {len(trends)} station(s) écrite dans la feuille Analyse.")
+        QMessageBox.information(self, "Succès", f"Analyse de {len(trends)} station(s) écrite dans l'Excel.")
+
+    def detect_outliers(self):
+        if not self._check_loaded():
+            return
+        try:
+            flagged = flag_outliers(self.dataset.measurement_table())
+            flagged = cross_check_neighbours(flagged, StationIndex())
+        except Exception as e:
+            QMessageBox.critical(self, "Erreur contrôle", str(e))
+            return
+        if flagged.empty:
+            QMessageBox.information(self, "Contrôle terminé", "Aucune mesure à contrôler.")
+            return
+        outliers = flagged[flagged["aberrante"]]
+        n_confirmed = int(outliers["confirmee_voisines"].sum())
+        out_path = os.path.join(self.save_folder, "valeurs_aberrantes.csv")
+        outliers.to_csv(out_path, sep=";", decimal=",", index=False, encoding="utf-8-sig")
+        self.status_label.setText(f"{len(outliers)} valeur(s) aberrante(s) sur {len(flagged)} mesure(s).")
+        QMessageBox.information(
+            self, "Contrôle terminé",
+            f"{len(outliers)} valeur(s) aberrante(s) sur {len(flagged)} mesure(s), "
+            f"dont {n_confirmed} partagée(s) par une station voisine (événement probable).\n"
+            f"Liste : {out_path}"
+        )
+
+    def export_measure_evidence(self):
+        if not self._check_loaded():
+            return
+        if not self.input_folder:
+            QMessageBox.warning(self, "Attention", "Dossier des photos inconnu.")
+            return
+        station = self.station_combo.currentText()
+        stations = None if self.cb_evidence_all.isChecked() or not station else [station]
+        selections = load_selections(
+            selections_path_for(self.excel_file), stations,
+            self.evidence_from.date().toString("yyyy-MM-dd"),
+            self.evidence_to.date().toString("yyyy-MM-dd"),
+            include_undated=self.cb_evidence_undated.isChecked(),
+        )
+        if not selections:
+            QMessageBox.information(self, "Preuves", "Aucune mesure enregistrée sur cette période.")
+            return
+
+        self.evidence_out_folder = os.path.join(self.save_folder, "preuves")
+        self.btn_evidence.setEnabled(False)
+        self.status_label.setText(f"Export de {len(selections)} preuve(s)...")
+        QThreadPool.globalInstance().start(_EvidenceExportTask(
+            selections, self.input_folder, self.evidence_out_folder,
+            self.cb_evidence_pdf.isChecked(), self.evidence_signals
+        ))
+
+    def _on_evidence_progress(self, done, total):
+        self.status_label.setText(f"Export des preuves : {done} / {total}")
+
+    def _on_evidence_finished(self, produced):
+        self.btn_evidence.setEnabled(True)
+        self.status_label.setText(f"{len(produced)} fichier(s) de preuves exporté(s).")
+        QMessageBox.information(
+            self, "Succès", f"{len(produced)} fichier(s) de preuves exporté(s) dans :\n{self.evidence_out_folder}"
+        )
+
+    def _on_evidence_failed(self, message):
+        self.btn_evidence.setEnabled(True)
+        self.status_label.setText("")
+        QMessageBox.critical(self, "Erreur export", message)
+
+    def generate_overview_map(self):
+        if not self._check_loaded():
+            return
+
+        try:
+            overview = station_overview(self.dataset.summary, self.dataset.frames, self.dataset.ram_info)
+            index = StationIndex()
+        except Exception as e:
+            QMessageBox.critical(self, "Erreur lecture", str(e))
+            return
+
+        color_col = self.map_color_combo.currentText()
+        positions = dict(zip(index.codes, index.xy))
+        overview = overview[overview["Station"].isin(positions) & overview[color_col].notna()]
+        if overview.empty:
+            QMessageBox.warning(self, "Erreur", "Aucune station mesurée avec des coordonnées connues.")
+            return
+
+        fig, ax = plt.subplots(figsize=(8, 10))
+        plotted = set(overview["Station"])
+        missing = [c for c in index.codes if c not in plotted]
+        if missing:
+            grey = np.array([positions[c] for c in missing])
+            ax.scatter(grey[:, 0], grey[:, 1], s=12, color="lightgrey", zorder=1, label="Sans valeur")
+        xy = np.array([positions[c] for c in overview["Station"]])
+        values = overview[color_col].to_numpy()
+        if color_col.startswith("Tendance"):
+            lim = np.nanmax(np.abs(values)) or 1.0
+            sc = ax.scatter(xy[:, 0], xy[:, 1], c=values, cmap="RdBu", vmin=-lim, vmax=lim, s=40, zorder=2)
+        else:
+            sc = ax.scatter(xy[:, 0], xy[:, 1], c=values, cmap="viridis", s=40, zorder=2)
+        for code, (x, y) in zip(overview["Station"], xy):
+            ax.annotate(code, (x, y), xytext=(4, 2), textcoords="offset points", fontsize=7)
+        fig.colorbar(sc, ax=ax, label=color_col)
+        ax.set_title("Vue d'ensemble du littoral", fontweight="bold")
+        ax.set_xlabel("Est (km)")
+        ax.set_ylabel("Nord (km)")
+        ax.set_aspect("equal")
+        ax.grid(linestyle=":", alpha=0.5)
+        if missing:
+            ax.legend(loc="lower left", frameon=False)
+
+        out_path = os.path.join(self.save_folder, "carte_littoral.png")
+        fig.savefig(out_path, bbox_inches="tight")
+        plt.close(fig)
+        QMessageBox.information(self, "Succès", f"Carte générée :\n{out_path}")
+
+    def _draw_overlay(self, ax, df_plot, code):
+        choice = self.overlay_combo.currentText()
+        if choice not in OVERLAYS:
+            return
+        kind, column, label = OVERLAYS[choice]
+
+        if label is None:
+            # Tempêtes : bandes verticales sur les heures de rafales fortes
+            series = load_environment_series(code, kind, columns=[column])
+            if series.empty:
+                return
+            start, end = df_plot["Date / Heure"].min(), df_plot["Date / Heure"].max()
+            storms = series[(series["date"] >= start) & (series["date"] <= end)
+                            & (series[column] >= STORM_GUST_MS)]
+            for i, day in enumerate(storms["date"].dt.floor("D").unique()):
+                ax.axvspan(day, day + pd.Timedelta(days=1), color="grey", alpha=0.2,
+                           zorder=1, label="Tempête" if i == 0 else None)
+            return
+
+        joined = join_environment(df_plot, code, kind, columns=[column])
+        if column not in joined.columns or joined[column].isna().all():
+            return
+        ax2 = ax.twinx()
+        ax2.plot(joined["Date / Heure"], joined[column], color="C0", alpha=0.6, linewidth=1)
+        ax2.set_ylabel(label, color="C0")
+        ax2.tick_params(axis="y", labelcolor="C0")
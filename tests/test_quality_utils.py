@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+
+from functions.quality_utils import (
+    RunningStats, OutlierMonitor, flag_outliers,
+    WINDOW, MIN_HISTORY, THRESHOLD, MAD_SCALE, MIN_MAD_CM
+)
+
+
+def _table(series):
+    """series : { station: [valeurs] } -> table longue au format build_measurement_table."""
+    rows = []
+    for station, values in series.items():
+        for i, value in enumerate(values):
+            rows.append({"station": station, "photo": f"{i}.jpg",
+                         "timestamp": pd.Timestamp("2024-01-01") + pd.Timedelta(days=i),
+                         "result_cm": value, "sand_height_m": np.nan, "status": "mesuré"})
+    return pd.DataFrame(rows)
+
+
+def _reference_scores(values, window=WINDOW):
+    """Score de chaque valeur contre les window précédentes, calculé naïvement."""
+    scores = []
+    for i, value in enumerate(values):
+        history = np.asarray(values[max(0, i - window):i], dtype=float)
+        if len(history) < MIN_HISTORY:
+            scores.append(np.nan)
+            continue
+        median = np.median(history)
+        mad = np.median(np.abs(history - median))
+        scores.append(abs(value - median) / (MAD_SCALE * max(mad, MIN_MAD_CM)))
+    return np.array(scores)
+
+
+def test_flag_outliers_matches_naive_window_per_station():
+    rng = np.random.default_rng(0)
+    series = {
+        "SA": list(rng.normal(100, 8, 40)),
+        "SB": list(rng.normal(20, 3, 7)),   # station courte : fenêtre jamais pleine
+        "SC": list(rng.normal(150, 5, 30)),
+    }
+    series["SC"][20] = 40.0  # valeur aberrante
+    flagged = flag_outliers(_table(series))
+    for station, values in series.items():
+        got = flagged.loc[flagged["station"] == station, "score"].to_numpy()
+        # Les fenêtres ne débordent jamais sur la station précédente
+        np.testing.assert_allclose(got, _reference_scores(values), equal_nan=True)
+    sc = flagged[flagged["station"] == "SC"].reset_index(drop=True)
+    assert sc.loc[20, "aberrante"] and sc.loc[20, "score"] > THRESHOLD
+
+
+def test_flag_outliers_ignores_missing_results():
+    table = _table({"SA": [100.0, np.nan, 101.0]})
+    assert len(flag_outliers(table)) == 2
+
+
+def test_flag_outliers_empty_table_has_bool_flags():
+    flagged = flag_outliers(_table({}).reindex(columns=["station", "photo", "timestamp", "result_cm",
+                                                        "sand_height_m", "status"]))
+    assert flagged.empty and flagged["aberrante"].dtype == bool
+
+
+def test_running_stats_matches_numpy_on_sliding_window():
+    rng = np.random.default_rng(1)
+    values = rng.normal(50, 10, 60)
+    stats = RunningStats(window=WINDOW)
+    for i, value in enumerate(values):
+        stats.push(float(value))
+        window = values[max(0, i + 1 - WINDOW):i + 1]
+        assert stats.median() == np.median(window)
+        assert np.isclose(stats.mad(), np.median(np.abs(window - np.median(window))))
+
+
+def test_monitor_agrees_with_batch_check():
+    values = [100.0, 102.0, 99.0, 101.0, 98.0, 100.0, 180.0]
+    monitor = OutlierMonitor()
+    for value in values[:-1]:
+        monitor.record("sa", value)
+    improbable, score, median = monitor.check("SA", values[-1])
+    flagged = flag_outliers(_table({"SA": values}))
+    assert improbable == bool(flagged["aberrante"].iloc[-1])
+    assert np.isclose(score, flagged["score"].iloc[-1]) and median == 100.0
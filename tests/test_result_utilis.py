@@ -0,0 +1,40 @@
+import numpy as np
+
+from functions.result_utilis import minmax_decimate
+
+
+def test_short_series_is_kept_whole():
+    x = np.arange(10.0)
+    np.testing.assert_array_equal(minmax_decimate(x, x, n_bins=5), np.arange(10))
+
+
+def test_keeps_min_and_max_of_each_bin():
+    rng = np.random.default_rng(0)
+    x = np.sort(rng.uniform(0, 100, 5000))
+    y = rng.normal(0, 1, 5000)
+    y[1234] = 50.0    # pic
+    y[4321] = -50.0   # creux
+    keep = minmax_decimate(x, y, n_bins=100)
+    assert len(keep) <= 200
+    assert np.all(np.diff(keep) > 0)  # indices triés, sans doublon
+    assert 1234 in keep and 4321 in keep
+    bins = np.minimum(((x - x[0]) / (x[-1] - x[0]) * 100).astype(int), 99)
+    for b in range(100):
+        members = np.flatnonzero(bins == b)
+        assert members[np.argmin(y[members])] in keep
+        assert members[np.argmax(y[members])] in keep
+
+
+def test_nan_values_are_dropped():
+    x = np.arange(1000.0)
+    y = np.where(np.arange(1000) % 2, np.nan, np.arange(1000.0))
+    keep = minmax_decimate(x, y, n_bins=10)
+    assert not np.isnan(y[keep]).any()
+
+
+def test_constant_x_returns_sorted_extremes():
+    x = np.zeros(100)
+    y = np.arange(100.0)[::-1]
+    keep = minmax_decimate(x, y, n_bins=10)
+    assert np.all(np.diff(keep) > 0)
+    assert set(keep) == {0, 99}
@@ -0,0 +1,32 @@
+import os
+import time
+
+from functions import thumbnail_cache
+from functions.thumbnail_cache import prune_thumbnail_cache
+
+
+def _thumb(root, name, size, age_days):
+    path = os.path.join(root, name[:2], name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"\0" * size)
+    used = time.time() - age_days * 86400
+    os.utime(path, (used, used))
+    return path
+
+
+def test_prune_removes_stale_then_least_recently_used(tmp_path, monkeypatch):
+    monkeypatch.setattr(thumbnail_cache, "THUMB_DIR", str(tmp_path))
+    mb = 1024 * 1024
+    stale = _thumb(str(tmp_path), "aa_stale.jpg", 1000, age_days=400)
+    old = _thumb(str(tmp_path), "bb_old.jpg", mb, age_days=10)
+    recent = _thumb(str(tmp_path), "cc_recent.jpg", mb, age_days=1)
+
+    assert prune_thumbnail_cache(max_mb=1.5, max_age_days=180) == 2
+    assert not os.path.exists(stale) and not os.path.exists(old)
+    assert os.path.exists(recent)
+
+
+def test_prune_without_cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(thumbnail_cache, "THUMB_DIR", str(tmp_path / "absent"))
+    assert prune_thumbnail_cache() == 0
@@ -0,0 +1,112 @@
+import os
+import pytest
+from openpyxl import Workbook, load_workbook
+
+from functions.work_queue import WorkQueue, ORPHAN
+
+
+def _workbook(path, rows):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "ST1"
+    ws.append(["Nom de la photo", "Date", "Heure", "Résultat"])
+    for row in rows:
+        ws.append(row)
+    wb.save(path)
+
+
+def _results(path):
+    ws = load_workbook(path)["ST1"]
+    return {r[0]: r[3] for r in ws.iter_rows(min_row=2, values_only=True)}
+
+
+def _row(queue, station, photo):
+    with queue.workbook_lock() as conn:
+        return conn.execute(
+            "SELECT status, operator, lease_expires, result, merged FROM photos WHERE station=? AND photo=?",
+            (station, photo)
+        ).fetchone()
+
+
+@pytest.fixture
+def queue(tmp_path):
+    excel_file = str(tmp_path / "resultats_photos.xlsx")
+    _workbook(excel_file, [["a.jpg", "", "", ""], ["b.jpg", "", "", ""], ["c.jpg", "", "", 12.0]])
+    queue = WorkQueue(str(tmp_path / "file_attente.db"))
+    queue.sync_from_excel(excel_file)
+    return queue, excel_file
+
+
+def test_sync_queues_only_photos_without_result(queue):
+    queue, _ = queue
+    assert sorted(p for _, _, p in queue.lease("alice", count=10)) == ["a.jpg", "b.jpg"]
+
+
+def test_claim_refuses_photo_leased_by_someone_else(queue):
+    queue, _ = queue
+    queue.lease("alice", count=1)
+    assert not queue.claim("bob", "ST1", 0, "a.jpg")
+    assert queue.claim("bob", "ST1", 1, "b.jpg")
+    assert queue.claim("alice", "ST1", 0, "a.jpg")  # renouvellement par le détenteur
+
+
+def test_claim_takes_expired_lease(queue):
+    queue, _ = queue
+    queue.lease_s = -1  # bail immédiatement expiré
+    queue.lease("alice", count=1)
+    queue.lease_s = 60
+    assert queue.claim("bob", "ST1", 0, "a.jpg")
+    with pytest.raises(RuntimeError):
+        queue.submit("ST1", "a.jpg", 3.0, "alice")
+
+
+def test_submit_requires_the_lease(queue):
+    queue, _ = queue
+    with pytest.raises(RuntimeError):
+        queue.submit("ST1", "a.jpg", 3.0, "alice")  # jamais prêtée
+    assert queue.claim("alice", "ST1", 0, "a.jpg")
+    with pytest.raises(RuntimeError):
+        queue.submit("ST1", "a.jpg", 3.0, "bob")
+    queue.submit("ST1", "a.jpg", 3.0, "alice")
+    assert _row(queue, "ST1", "a.jpg")[0] == "done"
+
+
+def test_claim_adds_photo_missing_from_queue_and_keeps_done_status(queue):
+    queue, _ = queue
+    assert queue.claim("alice", "ST1", 2, "c.jpg", measured=True)
+    status, operator, lease_expires, _, _ = _row(queue, "ST1", "c.jpg")
+    assert (status, operator) == ("done", "alice") and lease_expires is not None
+    assert "c.jpg" not in [p for _, _, p in queue.lease("bob", count=10)]
+
+
+def test_release_keeps_done_rows(queue):
+    queue, _ = queue
+    queue.claim("alice", "ST1", 0, "a.jpg")
+    queue.claim("alice", "ST1", 2, "c.jpg", measured=True)
+    queue.release("alice", [("ST1", 0, "a.jpg"), ("ST1", 2, "c.jpg")])
+    assert _row(queue, "ST1", "a.jpg")[:3] == ("todo", None, None)
+    assert _row(queue, "ST1", "c.jpg")[:3] == ("done", "alice", None)
+
+
+def test_merge_matches_rows_by_photo_name(queue, tmp_path):
+    queue, excel_file = queue
+    queue.claim("alice", "ST1", 1, "b.jpg")
+    queue.submit("ST1", "b.jpg", "INEXPLOITABLE", "alice")
+    # Une photo insérée en tête décale toutes les lignes
+    _workbook(excel_file, [["0.jpg", "", "", ""], ["a.jpg", "", "", ""],
+                           ["b.jpg", "", "", ""], ["c.jpg", "", "", 12.0]])
+    assert queue.merge_into_excel(excel_file) == 1
+    assert _results(excel_file) == {"0.jpg": None, "a.jpg": None, "b.jpg": "INEXPLOITABLE", "c.jpg": 12.0}
+    assert _row(queue, "ST1", "b.jpg")[4] == 1
+
+
+def test_merge_without_match_marks_orphans_and_keeps_workbook(queue):
+    queue, excel_file = queue
+    queue.claim("alice", "ST1", 0, "a.jpg")
+    queue.submit("ST1", "a.jpg", 4.5, "alice")
+    _workbook(excel_file, [["b.jpg", "", "", ""]])
+    before = os.stat(excel_file).st_mtime_ns
+    assert queue.merge_into_excel(excel_file) == 0
+    assert os.stat(excel_file).st_mtime_ns == before
+    assert _row(queue, "ST1", "a.jpg")[4] == ORPHAN
+    assert queue.merge_into_excel(excel_file) == 0  # plus retenté